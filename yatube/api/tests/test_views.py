@@ -0,0 +1,185 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, Timeline
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f"Пост {number}",
+            )
+            for number in range(5)
+        ]
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.reader, text=f"Ответ {number}"
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def collect(self, client, url, params):
+        """Проходит все страницы по ссылкам next."""
+        items = []
+        response = client.get(url, params)
+        while True:
+            data = response.json()
+            items.extend(data["results"])
+            if data["next"] is None:
+                return items
+            response = client.get(data["next"])
+
+    def test_posts_cursor_pagination(self):
+        """Проверка обхода постов по курсору"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("api:posts"), {"limit": 2})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn("after=", response.json()["next"])
+        items = self.collect(self.client, reverse("api:posts"), {"limit": 2})
+        self.assertEqual(
+            [item["id"] for item in items],
+            [post.pk for post in reversed(self.posts)],
+        )
+        self.assertEqual(items[0]["author"], "author")
+        self.assertEqual(items[0]["group"], None)
+        self.assertEqual(items[1]["group"], "group")
+
+    def test_sparse_fields(self):
+        """Проверка выбора полей параметром fields"""
+        response = self.client.get(
+            reverse("api:posts"), {"fields": "id,author", "group": "group"}
+        )
+        results = response.json()["results"]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(set(results[0]), {"id", "author"})
+        response = self.client.get(reverse("api:posts"), {"fields": "secret"})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("secret", response.json()["detail"])
+
+    def test_post_detail_and_comments(self):
+        """Проверка поста и его комментариев"""
+        post = self.posts[0]
+        response = self.client.get(reverse("api:post_detail", args=[post.pk]))
+        self.assertEqual(response.json()["text"], post.text)
+        self.assertEqual(response.json()["comments_count"], 3)
+        comments = self.collect(
+            self.client,
+            reverse("api:post_comments", args=[post.pk]),
+            {"limit": 2},
+        )
+        self.assertEqual(
+            [comment["text"] for comment in comments],
+            ["Ответ 2", "Ответ 1", "Ответ 0"],
+        )
+        response = self.client.get(reverse("api:post_detail", args=[999]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_groups(self):
+        """Проверка списка и страницы групп"""
+        Group.objects.create(title="Вторая", slug="second")
+        groups = self.collect(self.client, reverse("api:groups"), {"limit": 1})
+        self.assertEqual(
+            [group["slug"] for group in groups], ["second", "group"]
+        )
+        response = self.client.get(
+            reverse("api:group_detail", args=["group"]), {"fields": "title"}
+        )
+        self.assertEqual(response.json(), {"title": "Группа"})
+
+    def test_follow_endpoints_require_login(self):
+        """Проверка ленты и списка подписок"""
+        for name in ("api:follow_feed", "api:follows"):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        feed = self.collect(self.reader_client, reverse("api:follow_feed"), {})
+        self.assertEqual(len(feed), 5)
+        follows = self.reader_client.get(reverse("api:follows")).json()
+        self.assertEqual(
+            follows["results"],
+            [
+                {
+                    "id": Follow.objects.get().pk,
+                    "user": "reader",
+                    "author": "author",
+                }
+            ],
+        )
+
+    def test_follow_feed_reads_timeline_index_range(self):
+        """Проверка, что лента подписок идёт по индексу без сортировки"""
+        # У автора несколько подписчиков: посты не должны повторяться
+        # по разу на каждого. Равные даты проверяют второй член ключа.
+        for number in range(2):
+            follower = User.objects.create_user(username=f"follower{number}")
+            Follow.objects.create(user=follower, author=self.author)
+        Timeline.objects.update(pub_date=self.posts[0].pub_date)
+        expected = list(
+            Timeline.objects.filter(user=self.reader)
+            .order_by("-pub_date", "-pk")
+            .values_list("post_id", flat=True)
+        )
+        self.assertEqual(len(expected), len(self.posts))
+        url = reverse("api:follow_feed")
+        with CaptureQueriesContext(connection) as queries:
+            feed = self.collect(self.reader_client, url, {"limit": 2})
+        self.assertEqual([item["id"] for item in feed], expected)
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + queries[-1]["sql"])
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("timeline_user_date_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_follow_feed_engines_agree(self):
+        """Проверка ленты подписок API при любом движке"""
+        Follow.objects.create(
+            user=User.objects.create_user(username="follower"),
+            author=self.author,
+        )
+        url = reverse("api:follow_feed")
+        expected = [post.pk for post in reversed(self.posts)]
+        for engine in ("timeline", "merge", "join"):
+            with self.subTest(engine=engine):
+                with override_settings(FOLLOW_FEED_ENGINE=engine):
+                    # Сессия, пользователь и одна страница ленты.
+                    with self.assertNumQueries(3):
+                        self.reader_client.get(url, {"limit": 2})
+                    feed = self.collect(self.reader_client, url, {"limit": 2})
+                self.assertEqual([item["id"] for item in feed], expected)
+
+    def test_bad_requests(self):
+        """Проверка ошибок в параметрах и методе запроса"""
+        url = reverse("api:posts")
+        cases = (
+            ({"after": "garbage"}, HTTPStatus.BAD_REQUEST),
+            ({"limit": "many"}, HTTPStatus.BAD_REQUEST),
+        )
+        for params, status in cases:
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.client.get(url, params).status_code, status
+                )
+        self.assertEqual(
+            self.client.post(url).status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
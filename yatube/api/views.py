@@ -0,0 +1,279 @@
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils.http import urlencode
+
+from posts.models import Comment, Follow, Group, Post, Timeline
+from posts.paginators import decode_cursor, encode_position
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+class Resource:
+    """Описание выдачи модели: имена полей ответа и их источники.
+
+    fields сопоставляет поле ответа пути для values(), поэтому
+    связанные объекты приходят тем же запросом через JOIN, а модели
+    не создаются вовсе. date_field задаёт порядок ключа курсора
+    (дата, id) по убыванию; без него страницы идут по id. key
+    заменяет этот ключ своим — аргументами order_by из даты и
+    уникального поля, когда индекс хранит строки в другом порядке.
+    """
+
+    def __init__(self, fields, date_field=None, converters=None, key=None):
+        self.fields = fields
+        self.converters = converters or {}
+        if key is None:
+            key = (f"-{date_field}", "-pk") if date_field else ("-pk",)
+        self.key = key
+
+    def requested_fields(self, request):
+        raw = request.GET.get("fields")
+        if not raw:
+            return list(self.fields)
+        names = [name.strip() for name in raw.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ApiError(
+                400,
+                "Неизвестные поля: {}. Доступны: {}".format(
+                    ", ".join(unknown), ", ".join(self.fields)
+                ),
+            )
+        return names
+
+    def rows(self, queryset, names, extra=()):
+        sources = {self.fields[name] for name in names}
+        sources.update(extra)
+        return queryset.values(*sources)
+
+    def serialize(self, request, row, names):
+        result = {}
+        for name in names:
+            value = row[self.fields[name]]
+            converter = self.converters.get(name)
+            if converter is not None:
+                value = converter(request, value)
+            result[name] = value
+        return result
+
+
+def image_url(request, name):
+    if not name:
+        return None
+    storage = Post._meta.get_field("image").storage
+    return request.build_absolute_uri(storage.url(name))
+
+
+POSTS = Resource(
+    {
+        "id": "pk",
+        "text": "text",
+        "pub_date": "pub_date",
+        "author": "author__username",
+        "group": "group__slug",
+        "image": "image",
+        "image_width": "image_width",
+        "image_height": "image_height",
+        "comments_count": "comments_count",
+    },
+    date_field="pub_date",
+    converters={"image": image_url},
+)
+
+# Лента подписок читается из записей Timeline читателя, а не из постов
+# с условием на timeline_entries: второй filter() с курсором добавил бы
+# к запросу новое, не ограниченное читателем соединение с лентой, и
+# пост повторялся бы по разу на каждого подписчика автора. Индекс
+# timeline_user_date_idx хранит записи по дате и id по убыванию, так
+# что страница читается его диапазоном без сортировки.
+FOLLOW_FEED = Resource(
+    {
+        name: "post_id" if source == "pk" else f"post__{source}"
+        for name, source in POSTS.fields.items()
+    },
+    date_field="pub_date",
+    converters=POSTS.converters,
+)
+
+COMMENTS = Resource(
+    {
+        "id": "pk",
+        "post": "post_id",
+        "author": "author__username",
+        "text": "text",
+        "created": "created",
+    },
+    date_field="created",
+)
+
+GROUPS = Resource(
+    {
+        "id": "pk",
+        "title": "title",
+        "slug": "slug",
+        "description": "description",
+    }
+)
+
+FOLLOWS = Resource(
+    {"id": "pk", "user": "user__username", "author": "author__username"}
+)
+
+
+def api_view(view):
+    """Только GET; ошибки ApiError превращаются в JSON с кодом."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            if request.method not in ("GET", "HEAD"):
+                raise ApiError(405, "Метод не поддерживается")
+            data = view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse(
+                {"detail": error.detail},
+                status=error.status,
+                json_dumps_params={"ensure_ascii": False},
+            )
+        return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
+
+    return wrapper
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            raise ApiError(401, "Требуется авторизация")
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get("limit", settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, "limit должен быть числом")
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+
+def after_position(key, position):
+    """Условие «строго после position» для ключа из аргументов order_by."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(key, position):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+def paginate(request, queryset, resource):
+    """Страница по курсору ?after= без OFFSET и COUNT(*).
+
+    Ответ: results и next — адрес следующей страницы или null.
+    """
+    names = resource.requested_fields(request)
+    limit = page_size(request)
+    after = request.GET.get("after")
+    key = resource.key
+    columns = [field.lstrip("-") for field in key]
+    queryset = queryset.order_by(*key)
+    if after is not None:
+        if len(key) == 2:
+            position = decode_cursor(after)
+        elif after.isdigit():
+            position = (int(after),)
+        else:
+            position = None
+        if position is None:
+            raise ApiError(400, "Неверный курсор")
+        queryset = queryset.filter(after_position(key, position))
+    rows = list(resource.rows(queryset, names, columns)[: limit + 1])
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if len(key) == 2:
+            cursor = encode_position(last[columns[0]], last[columns[1]])
+        else:
+            cursor = str(last[columns[0]])
+        params = request.GET.copy()
+        params["after"] = cursor
+        next_url = request.build_absolute_uri(
+            f"{request.path}?{urlencode(sorted(params.items()))}"
+        )
+    return {
+        "results": [resource.serialize(request, row, names) for row in rows],
+        "next": next_url,
+    }
+
+
+def detail(request, queryset, resource):
+    names = resource.requested_fields(request)
+    row = resource.rows(queryset, names).first()
+    if row is None:
+        raise ApiError(404, "Не найдено")
+    return resource.serialize(request, row, names)
+
+
+@api_view
+def posts(request):
+    queryset = Post.objects.all()
+    if request.GET.get("group"):
+        queryset = queryset.filter(group__slug=request.GET["group"])
+    if request.GET.get("author"):
+        queryset = queryset.filter(author__username=request.GET["author"])
+    return paginate(request, queryset, POSTS)
+
+
+@api_view
+def post_detail(request, post_id):
+    return detail(request, Post.objects.filter(pk=post_id), POSTS)
+
+
+@api_view
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise ApiError(404, "Не найдено")
+    return paginate(request, Comment.objects.filter(post=post_id), COMMENTS)
+
+
+@api_view
+def groups(request):
+    return paginate(request, Group.objects.all(), GROUPS)
+
+
+@api_view
+def group_detail(request, slug):
+    return detail(request, Group.objects.filter(slug=slug), GROUPS)
+
+
+@api_view
+@login_required
+def follow_feed(request):
+    # Движок merge собирает ленту в памяти, а для курсора по ключу
+    # нужен запрос к базе, поэтому вместо него читается лента timeline.
+    if settings.FOLLOW_FEED_ENGINE == "join":
+        # Подзапрос, а не JOIN по подпискам: посты не повторяются.
+        authors = Follow.objects.filter(user=request.user).values("author")
+        queryset = Post.objects.filter(author__in=authors)
+        return paginate(request, queryset, POSTS)
+    queryset = Timeline.objects.filter(user=request.user)
+    return paginate(request, queryset, FOLLOW_FEED)
+
+
+@api_view
+@login_required
+def follows(request):
+    return paginate(request, Follow.objects.filter(user=request.user), FOLLOWS)
@@ -0,0 +1,327 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Сколько ключей подставлять в один запрос IN.
+SQL_CHUNK = 500
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache ("
+    " key TEXT PRIMARY KEY,"
+    " value BLOB NOT NULL,"
+    " expires REAL,"
+    " accessed REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)",
+    "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)",
+)
+
+
+class TwoTierCache(BaseCache):
+    """Двухуровневый кэш: LRU в памяти процесса поверх общего SQLite.
+
+    L2 — файл SQLite в режиме WAL, общий для всех процессов сервера,
+    поэтому фрагмент, посчитанный одним воркером, достаётся остальным,
+    а удаление ключа видят все. L1 — небольшой LRU в памяти процесса,
+    снимающий нагрузку с файла для самых горячих ключей. Чужие
+    изменения L1 может не замечать не дольше L1_TIMEOUT секунд.
+
+    Параметры OPTIONS:
+        MAX_ENTRIES, CULL_FREQUENCY — размер L2 и доля вытесняемых
+            записей при переполнении, как у стандартных бэкендов;
+        EVICTION — "lru" (давно не читанные) или "fifo" (давно
+            записанные) записи вытесняются первыми;
+        CULL_EVERY — раз во сколько записей проверять переполнение;
+        L1_MAX_ENTRIES, L1_TIMEOUT — размер и срок жизни записей L1.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = location
+        self._eviction = options.get("EVICTION", "lru")
+        if self._eviction not in ("lru", "fifo"):
+            raise ValueError("EVICTION должен быть 'lru' или 'fifo'")
+        self._cull_every = int(options.get("CULL_EVERY", 100))
+        self._l1_max_entries = int(options.get("L1_MAX_ENTRIES", 1000))
+        self._l1_timeout = float(options.get("L1_TIMEOUT", 2))
+        self._l1 = OrderedDict()
+        self._l1_lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+
+    # Уровень L2
+
+    @property
+    def _db(self):
+        # Соединение своё у каждого потока и у каждого процесса после
+        # fork: соединения SQLite нельзя передавать между ними.
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _l2_get(self, key, now):
+        row = self._db.execute(
+            "SELECT value, expires, accessed FROM cache WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            self._db.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now)
+            )
+            return None
+        if self._eviction == "lru" and now - accessed > 1:
+            # Время чтения обновляется не чаще раза в секунду, чтобы
+            # горячий ключ не превращал каждое чтение в запись.
+            self._db.execute(
+                "UPDATE cache SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return value, expires
+
+    def _l2_get_many(self, keys, now):
+        rows = {}
+        expired = []
+        touched = []
+        for start in range(0, len(keys), SQL_CHUNK):
+            chunk = keys[start:start + SQL_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            for key, value, expires, accessed in self._db.execute(
+                "SELECT key, value, expires, accessed FROM cache "
+                f"WHERE key IN ({placeholders})",
+                chunk,
+            ):
+                if expires is not None and expires <= now:
+                    expired.append((key, now))
+                    continue
+                if self._eviction == "lru" and now - accessed > 1:
+                    touched.append((now, key))
+                rows[key] = value, expires
+        if expired:
+            self._db.executemany(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", expired
+            )
+        if touched:
+            self._db.executemany(
+                "UPDATE cache SET accessed = ? WHERE key = ?", touched
+            )
+        return rows
+
+    def _l2_set(self, key, value, expires, now):
+        self._l2_set_many([(key, value, expires, now)], now)
+
+    def _l2_set_many(self, rows, now):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO cache (key, value, expires, accessed) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        previous = self._writes
+        self._writes += len(rows)
+        if self._writes // self._cull_every != previous // self._cull_every:
+            self._cull(now)
+
+    def _cull(self, now):
+        db = self._db
+        db.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        if self._max_entries <= 0:
+            return
+        count = db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute("DELETE FROM cache")
+            return
+        order = "accessed" if self._eviction == "lru" else "rowid"
+        db.execute(
+            "DELETE FROM cache WHERE key IN ("
+            f"SELECT key FROM cache ORDER BY {order} LIMIT ?)",
+            (count // self._cull_frequency,),
+        )
+
+    # Уровень L1
+
+    def _l1_get(self, key, now):
+        with self._l1_lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            return entry[1]
+
+    def _l1_set(self, key, value, expires, now):
+        l1_expires = now + self._l1_timeout
+        if expires is not None:
+            l1_expires = min(l1_expires, expires)
+        with self._l1_lock:
+            self._l1[key] = (l1_expires, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._l1_lock:
+            self._l1.pop(key, None)
+
+    # Интерфейс BaseCache
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        value = self._l1_get(key, now)
+        if value is None:
+            row = self._l2_get(key, now)
+            if row is None:
+                return default
+            value, expires = row
+            self._l1_set(key, value, expires, now)
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self._l2_set(key, value, expires, now)
+        self._l1_set(key, value, expires, now)
+
+    def get_many(self, keys, version=None):
+        # Промахи L1 дочитываются из L2 одним запросом на SQL_CHUNK
+        # ключей, а не запросом на каждый ключ, как в BaseCache.
+        made = {self._key(key, version): key for key in keys}
+        now = time.time()
+        values = {}
+        missing = []
+        for key in made:
+            value = self._l1_get(key, now)
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+        for key, (value, expires) in self._l2_get_many(missing, now).items():
+            self._l1_set(key, value, expires, now)
+            values[key] = value
+        return {
+            made[key]: pickle.loads(value) for key, value in values.items()
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (
+                self._key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                expires,
+                now,
+            )
+            for key, value in data.items()
+        ]
+        self._l2_set_many(rows, now)
+        for key, value, _, _ in rows:
+            self._l1_set(key, value, expires, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now)
+            )
+            added = db.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires, now),
+            ).rowcount
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        if added:
+            self._l1_set(key, value, expires, now)
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._l1_delete(key)
+        return bool(
+            self._db.execute(
+                "UPDATE cache SET expires = ? "
+                "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount
+        )
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._l1_delete(key)
+        self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        for key in keys:
+            self._l1_delete(key)
+        self._db.executemany(
+            "DELETE FROM cache WHERE key = ?", ((key,) for key in keys)
+        )
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version) is not self
+
+    def incr(self, key, delta=1, version=None):
+        # Чтение и запись идут в одной транзакции, поэтому инкременты
+        # разных процессов не теряются.
+        key = self._key(key, version)
+        now = time.time()
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._l2_get(key, now)
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value, expires = row
+            value = pickle.dumps(
+                pickle.loads(value) + delta, pickle.HIGHEST_PROTOCOL
+            )
+            db.execute(
+                "UPDATE cache SET value = ? WHERE key = ?", (value, key)
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        self._l1_set(key, value, expires, now)
+        return pickle.loads(value)
+
+    def clear(self):
+        with self._l1_lock:
+            self._l1.clear()
+        self._db.execute("DELETE FROM cache")
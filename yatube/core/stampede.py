@@ -0,0 +1,107 @@
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+STATS = ("recomputed", "early", "coalesced")
+
+
+def stats_key(name, stat):
+    """Ключ счётчика stat (recomputed, early, coalesced) для name."""
+    return f"stampede:{name}:{stat}"
+
+
+def _count(name, stat):
+    key = stats_key(name, stat)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+
+def get_stats(name):
+    """Возвращает значения счётчиков пересчётов для name."""
+    keys = {stats_key(name, stat): stat for stat in STATS}
+    values = cache.get_many(keys)
+    return {stat: values.get(key, 0) for key, stat in keys.items()}
+
+
+def _is_fresh(entry, version, now, beta):
+    # Вероятностное раннее истечение (XFetch): чем дольше пересчёт и
+    # чем ближе срок, тем вероятнее, что запрос пересчитает значение
+    # заранее, пока остальные ещё получают действующее.
+    entry_version, expires, delta, _ = entry
+    if entry_version != version:
+        return False
+    return now - delta * beta * math.log(1.0 - random.random()) < expires
+
+
+def mark_stale(request):
+    """Помечает ответ, собранный из фрагмента прежней версии.
+
+    Такой ответ не соответствует поколениям, прочитанным до рендеринга,
+    поэтому его нельзя ни сохранять целиком, ни помечать их ETag.
+    """
+    request.stale_fragments = True
+
+
+def get_or_compute(
+    key, compute, timeout, version=None, name=None, on_stale=None
+):
+    """Возвращает значение из кэша, пересчитывая его одним запросом.
+
+    Значение хранится под ключом без версии: после смены version или
+    истечения timeout прежнее значение ещё STAMPEDE_STALE_TTL секунд
+    отдаётся тем, кто не успел взять блокировку, пока единственный
+    запрос вызывает compute(). Если отдано значение другой версии,
+    вызывается on_stale(). Если отдать нечего, запрос до STAMPEDE_WAIT
+    секунд ждёт чужого пересчёта и лишь затем считает сам. name задаёт
+    имя счётчиков, по умолчанию — ключ.
+    """
+    name = name or key
+    now = time.time()
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(
+        entry, version, now, settings.STAMPEDE_BETA
+    ):
+        return entry[3]
+
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, settings.STAMPEDE_LOCK_TIMEOUT):
+        if entry is not None:
+            _count(name, "coalesced")
+            if entry[0] != version and on_stale is not None:
+                on_stale()
+            return entry[3]
+        deadline = now + settings.STAMPEDE_WAIT
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None and entry[0] == version:
+                _count(name, "coalesced")
+                return entry[3]
+        return compute()
+
+    try:
+        if entry is not None and entry[0] == version and entry[1] > now:
+            _count(name, "early")
+        _count(name, "recomputed")
+        start = time.time()
+        value = compute()
+        finish = time.time()
+        expires = math.inf if timeout is None else finish + timeout
+        stored_for = (
+            None if timeout is None else timeout + settings.STAMPEDE_STALE_TTL
+        )
+        cache.set(key, (version, expires, finish - start, value), stored_for)
+    finally:
+        # Блокировка могла истечь и достаться другому запросу: снимаем
+        # только свою.
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    return value
@@ -0,0 +1,72 @@
+from functools import partial
+
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core import stampede
+
+register = template.Library()
+
+
+class StampedeCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time, fragment_name, vary_on, version):
+        self.nodelist = nodelist
+        self.expire_time = expire_time
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.version = version
+
+    def render(self, context):
+        try:
+            expire_time = self.expire_time.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                f"'stampede_cache' got an unknown variable: "
+                f"{self.expire_time.var!r}"
+            )
+        if expire_time is not None:
+            expire_time = int(expire_time)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        version = self.version.resolve(context) if self.version else None
+        request = context.get("request")
+        on_stale = None
+        if request is not None:
+            on_stale = partial(stampede.mark_stale, request)
+        return stampede.get_or_compute(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time,
+            version=version,
+            name=self.fragment_name,
+            on_stale=on_stale,
+        )
+
+
+@register.tag("stampede_cache")
+def do_stampede_cache(parser, token):
+    """Кэширует фрагмент так же, как {% cache %}, но без лавины промахов.
+
+    {% stampede_cache 21600 page_index page_obj|page_key version=gen %}
+
+    Пока один запрос пересчитывает фрагмент, остальные получают его
+    прежнюю версию; version задаёт поколение, смена которого требует
+    пересчёта. Запрос, получивший прежнюю версию, помечается
+    stampede.mark_stale: такую страницу не кэшируют целиком.
+    """
+    nodelist = parser.parse(("endstampede_cache",))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments."
+        )
+    version = None
+    if tokens[-1].startswith("version="):
+        version = parser.compile_filter(tokens.pop()[len("version="):])
+    return StampedeCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        version,
+    )
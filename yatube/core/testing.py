@@ -0,0 +1,21 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from yatube import test_settings
+
+
+class TestRunner(DiscoverRunner):
+    """manage.py test с настройками yatube.test_settings.
+
+    Рабочий модуль настроек остаётся тем же, а отличия тестовых
+    (OVERRIDES) включаются на время прогона.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._overrides = override_settings(**test_settings.OVERRIDES)
+        self._overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._overrides.disable()
+        super().teardown_test_environment(**kwargs)
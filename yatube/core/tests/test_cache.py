@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from ..cache import TwoTierCache
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.location = os.path.join(self.tmp_dir, "cache.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return TwoTierCache(self.location, {"OPTIONS": options})
+
+    def test_processes_share_second_tier(self):
+        """Проверка, что запись одного экземпляра видна другому"""
+        first = self.make_cache(L1_TIMEOUT=0)
+        second = self.make_cache(L1_TIMEOUT=0)
+        first.set("key", {"value": 1})
+        self.assertEqual(second.get("key"), {"value": 1})
+        self.assertTrue(second.add("counter", 1))
+        self.assertFalse(first.add("counter", 5))
+        self.assertEqual(first.incr("counter", 2), 3)
+        self.assertEqual(second.get("counter"), 3)
+        second.delete_many(["key", "counter"])
+        self.assertIsNone(first.get("key"))
+        self.assertEqual(first.get_many(["key", "counter"]), {})
+
+    def test_first_tier_is_bounded_in_time(self):
+        """Проверка, что L1 не скрывает чужие изменения дольше L1_TIMEOUT"""
+        first = self.make_cache(L1_TIMEOUT=0.2)
+        second = self.make_cache(L1_TIMEOUT=0.2)
+        first.set("key", "old")
+        self.assertEqual(first.get("key"), "old")
+        second.set("key", "new")
+        time.sleep(0.3)
+        self.assertEqual(first.get("key"), "new")
+
+    def test_expired_entries_are_not_returned(self):
+        """Проверка истечения срока жизни записи"""
+        cache = self.make_cache()
+        cache.set("key", "value", 0.1)
+        time.sleep(0.2)
+        self.assertIsNone(cache.get("key"))
+        self.assertTrue(cache.add("key", "again"))
+        self.assertEqual(cache.get("key"), "again")
+
+    def test_lru_eviction_keeps_recently_read_keys(self):
+        """Проверка вытеснения давно не читанных записей"""
+        cache = self.make_cache(
+            MAX_ENTRIES=4, CULL_FREQUENCY=2, CULL_EVERY=1, L1_TIMEOUT=0
+        )
+        for number in range(4):
+            cache.set(f"key{number}", number)
+        cache._db.execute(
+            "UPDATE cache SET accessed = accessed - 10 WHERE key != ?",
+            (cache.make_key("key0"),),
+        )
+        cache.set("key4", 4)
+        self.assertEqual(cache.get("key0"), 0)
+        self.assertEqual(cache.get("key4"), 4)
+        self.assertIsNone(cache.get("key1"))
+        self.assertIsNone(cache.get("key2"))
+
+    def test_fifo_eviction_drops_oldest_writes(self):
+        """Проверка вытеснения давно записанных записей"""
+        cache = self.make_cache(
+            MAX_ENTRIES=4,
+            CULL_FREQUENCY=2,
+            CULL_EVERY=1,
+            EVICTION="fifo",
+            L1_TIMEOUT=0,
+        )
+        for number in range(5):
+            cache.set(f"key{number}", number)
+        self.assertIsNone(cache.get("key0"))
+        self.assertIsNone(cache.get("key1"))
+        self.assertEqual(cache.get("key4"), 4)
+
+    def test_first_tier_is_bounded_in_size(self):
+        """Проверка ограничения размера L1"""
+        cache = self.make_cache(L1_MAX_ENTRIES=2)
+        for number in range(3):
+            cache.set(f"key{number}", number)
+        self.assertEqual(len(cache._l1), 2)
+        self.assertNotIn(cache.make_key("key0"), cache._l1)
+        self.assertEqual(cache.get("key0"), 0)
+
+    def test_many_keys_take_one_statement(self):
+        """Проверка, что get_many и set_many обращаются к L2 разом"""
+        cache = self.make_cache(L1_TIMEOUT=0)
+        db = mock.Mock(wraps=cache._db)
+        data = {f"key{number}": number for number in range(10)}
+        with mock.patch.object(
+            TwoTierCache, "_db", new_callable=mock.PropertyMock
+        ) as connection:
+            connection.return_value = db
+            cache.set_many(data)
+            self.assertEqual(db.executemany.call_count, 1)
+            self.assertEqual(db.execute.call_count, 0)
+            values = cache.get_many(list(data) + ["missing"])
+        self.assertEqual(values, data)
+        self.assertEqual(db.execute.call_count, 1)
+        self.assertEqual(db.executemany.call_count, 1)
+
+
+class TestCacheLocationTest(SimpleTestCase):
+    def test_tests_do_not_share_working_cache(self):
+        """Проверка, что тесты не пишут в кэш сервера разработки"""
+        working = os.path.join(settings.BASE_DIR, "cache.sqlite3")
+        self.assertNotEqual(settings.CACHES["default"]["LOCATION"], working)
+        self.assertNotEqual(cache._path, working)
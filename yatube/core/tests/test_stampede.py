@@ -0,0 +1,110 @@
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from .. import stampede
+
+
+@override_settings(STAMPEDE_BETA=0, STAMPEDE_WAIT=0.1)
+class StampedeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f"value {self.calls}"
+
+    def test_value_is_computed_once_per_version(self):
+        """Проверка, что значение пересчитывается только при смене версии"""
+        for _ in range(3):
+            self.assertEqual(
+                stampede.get_or_compute("key", self.compute, 60, version=1),
+                "value 1",
+            )
+        self.assertEqual(
+            stampede.get_or_compute("key", self.compute, 60, version=2),
+            "value 2",
+        )
+        self.assertEqual(stampede.get_stats("key")["recomputed"], 2)
+
+    def test_stale_value_is_served_while_recomputing(self):
+        """Проверка, что без блокировки отдаётся прежнее значение"""
+        stampede.get_or_compute("key", self.compute, 60, version=1)
+        cache.add("key:lock", 1)
+        self.assertEqual(
+            stampede.get_or_compute("key", self.compute, 60, version=2),
+            "value 1",
+        )
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(stampede.get_stats("key")["coalesced"], 1)
+
+    def test_stale_version_is_reported(self):
+        """Проверка, что отданное значение прежней версии помечается"""
+        stale = []
+
+        def on_stale():
+            stale.append(True)
+
+        stampede.get_or_compute("key", self.compute, 60, version=1)
+        cache.add("key:lock", "other")
+        for version in (1, 2):
+            stampede.get_or_compute(
+                "key", self.compute, 60, version=version, on_stale=on_stale
+            )
+        self.assertEqual(stale, [True])
+
+    def test_lock_taken_by_another_request_is_kept(self):
+        """Проверка, что запрос снимает только свою блокировку"""
+
+        def slow_compute():
+            # Своя блокировка истекла, и её взял другой запрос.
+            cache.set("key:lock", "other")
+            return self.compute()
+
+        stampede.get_or_compute("key", slow_compute, 60)
+        self.assertEqual(cache.get("key:lock"), "other")
+        cache.delete("key:lock")
+        stampede.get_or_compute("key", self.compute, 60, version=2)
+        self.assertIsNone(cache.get("key:lock"))
+
+    def test_empty_cache_waits_then_computes(self):
+        """Проверка пересчёта, если чужой пересчёт не успел завершиться"""
+        cache.add("key:lock", 1)
+        self.assertEqual(
+            stampede.get_or_compute("key", self.compute, 60), "value 1"
+        )
+
+    @override_settings(STAMPEDE_BETA=1)
+    def test_early_recompute_before_expiry(self):
+        """Проверка вероятностного пересчёта до истечения срока"""
+        cache.set("key", (1, time.time() + 5, 10.0, "old"))
+        with mock.patch("core.stampede.random.random", return_value=0):
+            value = stampede.get_or_compute("key", self.compute, 60, version=1)
+        self.assertEqual(value, "old")
+        with mock.patch("core.stampede.random.random", return_value=0.999):
+            value = stampede.get_or_compute("key", self.compute, 60, version=1)
+        self.assertEqual(value, "value 1")
+        self.assertEqual(stampede.get_stats("key")["early"], 1)
+
+    def test_template_tag(self):
+        """Проверка тега stampede_cache и команды статистики"""
+        template = Template(
+            "{% load stampede %}"
+            "{% stampede_cache 60 page_index number version=gen %}"
+            "{{ text }}{% endstampede_cache %}"
+        )
+        first = template.render(Context({"number": 1, "gen": 1, "text": "a"}))
+        cached = template.render(
+            Context({"number": 1, "gen": 1, "text": "b"})
+        )
+        fresh = template.render(Context({"number": 1, "gen": 2, "text": "c"}))
+        self.assertEqual((first, cached, fresh), ("a", "a", "c"))
+        out = StringIO()
+        call_command("stampede_stats", "page_index", stdout=out)
+        self.assertIn("пересчётов 2", out.getvalue())
@@ -1,9 +1,52 @@
+import hashlib
+
 from django.contrib import admin
 
-from .models import Group, Post
+from . import search
+from .counters import feed_count_key
+from .generations import get_generation
+from .models import Comment, Follow, Group, Post
+from .paginators import WindowedPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Админка для таблиц на миллионы строк.
+
+    Связанные объекты подгружаются в запросе страницы
+    (list_select_related), связи редактируются виджетами raw_id или
+    autocomplete вместо списков всех объектов, а число строк не
+    считается заново на каждой странице: общее число не выводится
+    вовсе, а число отфильтрованных берётся из кэша. Ключ кэша включает
+    поколение таблицы, которое сбрасывается при каждом изменении её
+    строк, так что после правок число считается заново.
+    """
 
+    show_full_result_count = False
+    list_per_page = 50
 
-class PostAdmin(admin.ModelAdmin):
+    def get_count_key(self, queryset):
+        sql = str(queryset.order_by().query).encode()
+        generation = get_generation("table", queryset.model._meta.label_lower)
+        return f"admin:count:{generation}:{hashlib.md5(sql).hexdigest()}"
+
+    def get_paginator(
+        self,
+        request,
+        queryset,
+        per_page,
+        orphans=0,
+        allow_empty_first_page=True,
+    ):
+        return WindowedPaginator(
+            queryset,
+            per_page,
+            self.get_count_key(queryset),
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+        )
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = (
         "pk",
         "text",
@@ -11,11 +54,54 @@ class PostAdmin(admin.ModelAdmin):
         "author",
         "group",
     )
-    list_editable = ("group",)
+    list_select_related = ("author", "group")
     search_fields = ("text",)
     list_filter = ("pub_date",)
+    date_hierarchy = "pub_date"
+    raw_id_fields = ("author",)
+    autocomplete_fields = ("group",)
+    empty_value_display = "-пусто-"
+
+    def get_count_key(self, queryset):
+        # Число всех постов уже поддерживают сигналы для ленты.
+        if not queryset.query.where:
+            return feed_count_key("all")
+        return super().get_count_key(queryset)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск идёт по индексу FTS5 вместо LIKE '%...%' по всей
+        # таблице; порядок и фильтры списка сохраняются.
+        if not search_term or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+        match = search.match_expression(search_term)
+        if not match:
+            return queryset.none(), False
+        return search.filter_matching(queryset, match), False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ("pk", "title", "slug")
+    search_fields = ("title", "slug")
+    prepopulated_fields = {"slug": ("title",)}
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ("pk", "text", "created", "author", "post")
+    list_select_related = ("author", "post")
+    search_fields = ("=author__username",)
+    date_hierarchy = "created"
+    raw_id_fields = ("author", "post")
     empty_value_display = "-пусто-"
 
 
+class FollowAdmin(LargeTableAdmin):
+    list_display = ("pk", "user", "author")
+    list_select_related = ("user", "author")
+    search_fields = ("=user__username", "=author__username")
+    raw_id_fields = ("user", "author")
+
+
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
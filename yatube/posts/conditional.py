@@ -0,0 +1,129 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.middleware.csrf import get_token
+from django.views.decorators.http import condition
+
+from . import generations
+from .middleware import set_page_tags
+from .models import Group, Post, User
+
+
+def conditional_page(scopes_func, per_user=True):
+    """Декоратор страницы, зависящей от поколений scopes_func.
+
+    scopes_func(request, *args, **kwargs) возвращает поколения страницы
+    не более чем одним запросом по индексу. По ним до рендеринга
+    вычисляются ETag и Last-Modified, и неизменившаяся страница
+    отдаётся ответом 304 без обращения к шаблонам. per_user=False
+    для страниц, одинаковых для всех читателей: их ETag не зависит
+    от пользователя.
+    """
+
+    def page_tags(request, *args, **kwargs):
+        if not hasattr(request, "page_cache_tags"):
+            set_page_tags(request, *scopes_func(request, *args, **kwargs))
+        return request.page_cache_tags
+
+    def etag(request, *args, **kwargs):
+        tags = page_tags(request, *args, **kwargs)
+        if not tags:
+            return None
+        reader = None
+        if per_user and request.user.is_authenticated:
+            # Страница несёт CSRF-токен формы: после нового входа токен
+            # другой, и прежняя копия из кэша браузера не годится.
+            get_token(request)
+            reader = (request.user.pk, request.META["CSRF_COOKIE"])
+        raw = repr((sorted(tags.items()), reader, request.get_full_path()))
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        # Поколение — время последнего изменения в наносекундах, а
+        # Last-Modified точен до секунды. Пока секунда изменения не
+        # прошла, следующее изменение получило бы ту же дату и ложный
+        # ответ 304, поэтому до тех пор заголовок не отдаётся.
+        tags = page_tags(request, *args, **kwargs)
+        if not tags:
+            return None
+        seconds = -(-max(tags.values()) // 10 ** 9)
+        if seconds > time.time():
+            return None
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+    def decorator(view):
+        return _drop_stale_validators(
+            condition(etag_func=etag, last_modified_func=last_modified)(view)
+        )
+
+    return decorator
+
+
+def _drop_stale_validators(view):
+    """Снимает ETag и Last-Modified со страницы из прежних фрагментов.
+
+    Такая страница собрана не по тем поколениям, из которых посчитаны
+    валидаторы, и с ними подтверждалась бы в кэше браузера.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if getattr(request, "stale_fragments", False):
+            del response["ETag"]
+            del response["Last-Modified"]
+        return response
+
+    return wrapper
+
+
+def index_scopes(request):
+    return [("index",)]
+
+
+def group_scopes(request, slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list("pk", flat=True).first()
+    )
+    if group_id is None:
+        return []
+    return [("group", group_id)]
+
+
+def author_scopes(request, username):
+    author_id = (
+        User.objects.filter(username=username)
+        .values_list("pk", flat=True)
+        .first()
+    )
+    if author_id is None:
+        return []
+    return [("author", author_id)]
+
+
+def profile_scopes(request, username):
+    scopes = author_scopes(request, username)
+    if scopes:
+        # Число подписчиков и подписок меняется без новых постов.
+        scopes.append(("stats", scopes[0][1]))
+    if scopes and request.user.is_authenticated:
+        # Кнопка подписки зависит от подписок читателя.
+        scopes.append(("follow", request.user.pk))
+    return scopes
+
+
+def follow_scopes(request):
+    return generations.follow_scopes(request.user.pk)
+
+
+def post_scopes(request, post_id):
+    post = Post.objects.filter(pk=post_id).values("author_id", "group_id")
+    post = post.first()
+    if post is None:
+        return []
+    scopes = [("post", post_id), ("author", post["author_id"])]
+    if post["group_id"] is not None:
+        scopes.append(("group", post["group_id"]))
+    return scopes
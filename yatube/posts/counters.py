@@ -0,0 +1,150 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _bump(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    """Сдвигает счётчик пользователя на delta.
+
+    Строки счётчиков создаются вместе с пользователем или командой
+    recount, поэтому для удаляемого пользователя обновление просто
+    ничего не затрагивает.
+    """
+    _bump(UserStats.objects.filter(user=user_id), field, delta)
+
+
+def bump_comments(post_id, delta):
+    """Сдвигает счётчик комментариев поста на delta."""
+    _bump(Post.objects.filter(pk=post_id), "comments_count", delta)
+
+
+def get_stats(user):
+    """Возвращает счётчики пользователя, пересчитывая отсутствующие."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        recount(User.objects.filter(pk=user.pk))
+        return UserStats.objects.get(user=user)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def recount(users=None):
+    """Пересчитывает счётчики по таблицам, исправляя расхождения.
+
+    Без аргумента пересчитывает все счётчики, иначе — только счётчики
+    переданных пользователей и их постов.
+    """
+    users = User.objects.all() if users is None else users
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in users.values_list("pk", flat=True)),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    UserStats.objects.filter(user__in=users).update(
+        posts_count=_count(Post.objects.all(), "author"),
+        followers_count=_count(Follow.objects.all(), "author"),
+        following_count=_count(Follow.objects.all(), "user"),
+    )
+    Post.objects.filter(author__in=users).update(
+        comments_count=_count(Comment.objects.all(), "post")
+    )
+
+
+def feed_count_key(scope, pk=None):
+    """Ключ кэша с числом постов ленты: all, group, author или follow."""
+    if pk is None:
+        return f"posts:count:{scope}"
+    return f"posts:count:{scope}:{pk}"
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Счётчика нет в кэше: его посчитает следующий запрос ленты.
+        pass
+
+
+def following_key(user_id):
+    """Ключ кэша со списком авторов, на которых подписан пользователь."""
+    return f"posts:following:{user_id}"
+
+
+def following_ids(user_id):
+    """Id авторов, на которых подписан пользователь, из кэша.
+
+    Список сбрасывается сигналами при подписке и отписке.
+    """
+    key = following_key(user_id)
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = sorted(
+            Follow.objects.filter(user=user_id).values_list(
+                "author_id", flat=True
+            )
+        )
+        cache.set(key, author_ids, None)
+    return author_ids
+
+
+def count_generation_key(author_id):
+    """Ключ поколения числа постов автора в лентах подписчиков."""
+    return f"posts:count:generation:{author_id}"
+
+
+def follow_count_key(user_id):
+    """Ключ кэша с числом постов ленты подписок пользователя.
+
+    В ключ входят поколения счётчиков всех авторов из подписок: пост
+    меняет поколение только своего автора, и ключи лент его подписчиков
+    устаревают сами, без обхода подписчиков при записи. Новое поколение
+    берётся из текущего времени, как и в generations.
+    """
+    keys = [count_generation_key(pk) for pk in following_ids(user_id)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    digest = hashlib.md5(repr(sorted(versions.items())).encode()).hexdigest()
+    return f"{feed_count_key('follow', user_id)}:{digest}"
+
+
+def bump_feed_counts(post, delta):
+    """Сдвигает кэшированные размеры лент, в которые входит пост."""
+    _incr(feed_count_key("all"), delta)
+    _incr(feed_count_key("author", post.author_id), delta)
+    if post.group_id is not None:
+        _incr(feed_count_key("group", post.group_id), delta)
+    cache.delete(count_generation_key(post.author_id))
+
+
+def move_group_count(old_group_id, new_group_id):
+    """Переносит пост между кэшированными размерами лент групп."""
+    if old_group_id is not None:
+        _incr(feed_count_key("group", old_group_id), -1)
+    if new_group_id is not None:
+        _incr(feed_count_key("group", new_group_id), 1)
@@ -0,0 +1,105 @@
+import csv
+import json
+
+from django.conf import settings
+
+from .models import Comment
+
+FORMATS = {
+    "json": "application/json",
+    "csv": "text/csv",
+}
+
+CSV_FIELDS = ("id", "author", "group", "pub_date", "text", "image", "comments")
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def batches(posts, batch_size=None):
+    """Посты пачками по возрастанию id, без OFFSET.
+
+    Каждая пачка — отдельный запрос pk > последнего id, так что
+    в памяти одновременно только batch_size постов.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    posts = posts.select_related("author", "group").order_by("pk")
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        yield batch
+        if len(batch) < batch_size:
+            return
+
+
+def records(posts, image_url=None, batch_size=None):
+    """Словари постов с группой, картинкой и комментариями.
+
+    Комментарии пачки читаются одним запросом через iterator().
+    image_url превращает путь картинки в ссылку; по умолчанию
+    берётся url хранилища.
+    """
+    for batch in batches(posts, batch_size):
+        comments = {post.pk: [] for post in batch}
+        queryset = (
+            Comment.objects.filter(post__in=list(comments))
+            .select_related("author")
+            .order_by("post_id", "created", "pk")
+        )
+        for comment in queryset.iterator():
+            comments[comment.post_id].append(
+                {
+                    "author": comment.author.username,
+                    "text": comment.text,
+                    "created": comment.created.isoformat(),
+                }
+            )
+        for post in batch:
+            image = ""
+            if post.image:
+                image = post.image.url
+                if image_url is not None:
+                    image = image_url(image)
+            yield {
+                "id": post.pk,
+                "author": post.author.username,
+                "group": post.group.slug if post.group else None,
+                "pub_date": post.pub_date.isoformat(),
+                "text": post.text,
+                "image": image,
+                "comments": comments[post.pk],
+            }
+
+
+def stream_json(rows):
+    """Массив JSON по одному элементу за раз."""
+    yield "["
+    separator = "\n"
+    for row in rows:
+        yield separator + json.dumps(row, ensure_ascii=False)
+        separator = ",\n"
+    yield "\n]\n"
+
+
+def stream_csv(rows):
+    """CSV с заголовком; комментарии кладутся в колонку строкой JSON."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for row in rows:
+        row["comments"] = json.dumps(row["comments"], ensure_ascii=False)
+        yield writer.writerow([row[field] for field in CSV_FIELDS])
+
+
+def stream(posts, fmt, image_url=None):
+    """Выгрузка постов в формате json или csv по кускам."""
+    rows = records(posts, image_url)
+    if fmt == "csv":
+        return stream_csv(rows)
+    return stream_json(rows)
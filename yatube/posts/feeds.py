@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import linebreaksbr, truncatechars
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from . import conditional
+from .middleware import page_cache_key, serve_cached, set_page_tags
+from .models import Group, Post, User
+
+
+def cached_feed(feed, scopes_func):
+    """Представление ленты с условным GET и кэшем тела ответа.
+
+    Лента одинакова для всех читателей, поэтому тело кэшируется для
+    любых запросов, а не только анонимных, — в той же записи, что
+    и у AnonymousPageCacheMiddleware. Копия верна, пока не сменились
+    поколения, прочитанные до её построения: опрос без новых постов
+    стоит не больше одного запроса по индексу, а с If-None-Match
+    заканчивается ответом 304.
+    """
+    conditional_feed = conditional.conditional_page(
+        scopes_func, per_user=False
+    )(feed)
+
+    def view(request, *args, **kwargs):
+        tags = set_page_tags(request, *scopes_func(request, *args, **kwargs))
+        key = page_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == tags:
+            return serve_cached(request, entry[1])
+        response = conditional_feed(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, (tags, response), settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+    return view
+
+
+class PostsFeed(Feed):
+    """Общая часть лент: посты с автором, группой и текстом."""
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr("description", obj)
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        posts = self.posts(obj).select_related("author", "group")
+        return posts[: settings.FEED_ITEMS]
+
+    def item_title(self, post):
+        return truncatechars(post.text.replace("\n", " "), 60)
+
+    def item_description(self, post):
+        return linebreaksbr(post.text)
+
+    def item_link(self, post):
+        return reverse("posts:post_detail", args=[post.pk])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group else []
+
+
+class LatestPostsFeed(PostsFeed):
+    title = "Yatube: последние записи"
+    description = "Последние обновления на сайте"
+
+    def link(self):
+        return reverse("posts:index")
+
+
+class GroupPostsFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f"Yatube: {group.title}"
+
+    def description(self, group):
+        return f'Записи сообщества "{group.title}"'
+
+    def link(self, group):
+        return reverse("posts:group_list", args=[group.slug])
+
+    def posts(self, group):
+        return group.posts.all()
+
+
+class AuthorPostsFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f"Yatube: {author.get_full_name() or author.username}"
+
+    def description(self, author):
+        return f"Все посты пользователя {author.username}"
+
+    def link(self, author):
+        return reverse("posts:profile", args=[author.username])
+
+    def posts(self, author):
+        return author.posts.all()
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
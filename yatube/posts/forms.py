@@ -1,5 +1,6 @@
 from django import forms
 
+from .images import normalize
 from .models import Comment, Post
 
 
@@ -12,6 +13,14 @@ class PostForm(forms.ModelForm):
             "image",
         )
 
+    def clean_image(self):
+        image = self.cleaned_data.get("image")
+        # Новую загрузку forms.ImageField снабжает атрибутом image;
+        # прежний файл редактируемого поста остаётся как есть.
+        if image and hasattr(image, "image"):
+            return normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
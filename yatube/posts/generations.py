@@ -0,0 +1,135 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from .counters import following_ids
+from .models import Comment, Post
+
+
+def generation_key(scope, pk=None):
+    """Ключ поколения кэша области scope.
+
+    Области: index, group, author, stats, follow, post, thumbnails
+    и table; stats — счётчики подписчиков и подписок в профиле,
+    thumbnails — сведения о готовых миниатюрах (posts.thumbnails),
+    table — строки таблицы модели с меткой pk, например
+    "posts.comment" (числа строк в админке).
+    """
+    if pk is None:
+        return f"posts:generation:{scope}"
+    return f"posts:generation:{scope}:{pk}"
+
+
+def get_generation(scope, pk=None):
+    """Возвращает текущее поколение, заводя новое при его отсутствии.
+
+    Новое поколение берётся из текущего времени, поэтому поколение,
+    вытесненное из кэша, не совпадёт ни с одним прежним и старые
+    фрагменты не воскреснут.
+    """
+    key = generation_key(scope, pk)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_generations(scopes):
+    """Поколения нескольких областей одним обращением к кэшу.
+
+    Возвращает словарь ключ поколения -> поколение; недостающие
+    поколения заводятся так же, как в get_generation.
+    """
+    keys = [generation_key(*scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return generations
+
+
+def follow_scopes(user_id):
+    """Области ленты подписок: подписки читателя и их авторы.
+
+    Новый пост меняет поколение только своего автора, и ленты его
+    подписчиков устаревают сами, без обхода подписчиков при записи.
+    """
+    return [("follow", user_id)] + [
+        ("author", author_id) for author_id in following_ids(user_id)
+    ]
+
+
+def combined_generation(scopes):
+    """Одна строка-версия для фрагмента, зависящего от многих областей."""
+    generations = sorted(get_generations(scopes).items())
+    return hashlib.md5(repr(generations).encode()).hexdigest()
+
+
+def invalidate(*keys):
+    """Сбрасывает поколения: фрагменты с прежними ключами устаревают."""
+    cache.delete_many(keys)
+
+
+def invalidate_post(post, old_group_id=None):
+    """Сбрасывает поколения всех лент, в которые входит пост."""
+    keys = [
+        generation_key("index"),
+        generation_key("author", post.author_id),
+        generation_key("post", post.pk),
+    ]
+    for group_id in {post.group_id, old_group_id} - {None}:
+        keys.append(generation_key("group", group_id))
+    invalidate(*keys)
+
+
+def invalidate_group(group):
+    """Сбрасывает поколения страниц, где выводится название группы.
+
+    Кроме ленты группы это главная страница и профили авторов её
+    постов; страницы постов зависят от поколения группы сами.
+    """
+    authors = (
+        Post.objects.filter(group=group.pk)
+        .order_by()
+        .values_list("author_id", flat=True)
+        .distinct()
+    )
+    invalidate(
+        generation_key("index"),
+        generation_key("group", group.pk),
+        *(generation_key("author", pk) for pk in authors.iterator()),
+    )
+
+
+def invalidate_author(user_id):
+    """Сбрасывает поколения страниц, где выводится имя пользователя.
+
+    Это профиль и ленты подписчиков (через поколение автора), главная
+    страница, группы с его постами и посты с его комментариями.
+    """
+    groups = (
+        Post.objects.filter(author=user_id, group__isnull=False)
+        .order_by()
+        .values_list("group_id", flat=True)
+        .distinct()
+    )
+    commented = (
+        Comment.objects.filter(author=user_id)
+        .order_by()
+        .values_list("post_id", flat=True)
+        .distinct()
+    )
+    invalidate(
+        generation_key("index"),
+        generation_key("author", user_id),
+        *(generation_key("group", pk) for pk in groups.iterator()),
+        *(generation_key("post", pk) for pk in commented.iterator()),
+    )
+
+
+def invalidate_comments(post_id):
+    """Сбрасывает поколение комментариев поста."""
+    invalidate(generation_key("post", post_id))
@@ -0,0 +1,194 @@
+import base64
+import logging
+import os
+import threading
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.images import get_image_dimensions
+from django.db import connection
+from django.db.models import Q
+from PIL import Image, ImageOps
+from sorl.thumbnail import delete
+
+from . import thumbnails
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp", "PNG": "png"}
+
+# Ширина размытой копии картинки (LQIP), которая встраивается в
+# страницу и видна, пока грузится миниатюра.
+LQIP_WIDTH = 16
+
+# Сколько секунд после последней загрузки файл не удаляется: новый пост
+# с этой картинкой мог ещё не сохраниться.
+RELEASE_GRACE = 60
+
+
+def read_dimensions(image):
+    """Ширина и высота картинки или (None, None), если её не прочитать.
+
+    Только что загруженный файл читается из памяти, сохранённый —
+    из хранилища.
+    """
+    if not image:
+        return None, None
+    try:
+        return get_image_dimensions(image, close=image._committed)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        return None, None
+
+
+def make_lqip(image):
+    """Размытая копия картинки как data: URI; "" — если не прочитать."""
+    if not image:
+        return ""
+    try:
+        image.open("rb")
+        with Image.open(image) as picture:
+            picture.draft("RGB", (LQIP_WIDTH, LQIP_WIDTH))
+            picture = ImageOps.exif_transpose(picture)
+            picture.thumbnail((LQIP_WIDTH, LQIP_WIDTH))
+            buffer = BytesIO()
+            _flatten(picture).save(buffer, "JPEG", quality=40)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        return ""
+    finally:
+        if image._committed:
+            image.close()
+    data = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/jpeg;base64,{data}"
+
+
+def backfill_dimensions(posts, batch_size):
+    """Заполняет размеры и размытые копии картинок постов пачками.
+
+    Возвращает число заполненных постов. Посты, картинку которых
+    прочитать не удалось, остаются без размеров.
+    """
+    posts = (
+        posts.filter(Q(image_width__isnull=True) | Q(image_lqip=""))
+        .exclude(image="")
+        .order_by("pk")
+        .only("pk", "image")
+    )
+    filled = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return filled
+        last_pk = batch[-1].pk
+        for post in batch:
+            post.image_width, post.image_height = read_dimensions(post.image)
+            post.image_lqip = make_lqip(post.image)
+        batch = [post for post in batch if post.image_width is not None]
+        posts.model.objects.bulk_update(
+            batch, ["image_width", "image_height", "image_lqip"]
+        )
+        filled += len(batch)
+
+
+def _flatten(image):
+    # JPEG не хранит прозрачность: прозрачные области становятся белыми.
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def normalize(upload):
+    """Уменьшает загруженную картинку и перекодирует её без метаданных.
+
+    upload — файл, уже прошедший forms.ImageField: его заголовок
+    прочитан, но пиксели ещё не распакованы. Размеры из заголовка
+    проверяются до распаковки, так что «бомба» отклоняется сразу.
+    Сторона результата не больше POST_IMAGE_MAX_SIDE, формат и качество
+    задают POST_IMAGE_FORMAT и POST_IMAGE_QUALITY; EXIF и прочие
+    метаданные не переносятся, поворот из EXIF применяется к пикселям.
+    """
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            "Файл картинки слишком велик", code="image_too_large"
+        )
+    width, height = upload.image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            "Картинка слишком велика: %(width)s×%(height)s",
+            code="image_too_large",
+            params={"width": width, "height": height},
+        )
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    with Image.open(upload) as image:
+        # Для JPEG draft уменьшает картинку ещё при распаковке.
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        image_format = settings.POST_IMAGE_FORMAT
+        if image_format == "JPEG":
+            image = _flatten(image)
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        buffer = BytesIO()
+        image.save(
+            buffer,
+            image_format,
+            quality=settings.POST_IMAGE_QUALITY,
+            optimize=True,
+        )
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    return ContentFile(
+        buffer.getvalue(), name=f"{name}.{EXTENSIONS[image_format]}"
+    )
+
+
+def release(name):
+    """Удаляет файл картинки и его миниатюры, если на него нет ссылок.
+
+    Файлы хранятся по хэшу содержимого и делятся между постами, поэтому
+    удалять файл вместе с постом нельзя. Файл моложе RELEASE_GRACE не
+    удаляется сразу: release повторяется по истечении этого срока
+    (см. settings.POST_IMAGE_DEFERRED_RELEASE). Возвращает True, если
+    файл удалён.
+    """
+    if not name or Post.objects.filter(image=name).exists():
+        return False
+    storage = Post._meta.get_field("image").storage
+    try:
+        age = time.time() - os.path.getmtime(storage.path(name))
+        if age < RELEASE_GRACE:
+            _defer_release(name, RELEASE_GRACE - age)
+            return False
+        delete(name)
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.exception("Не удалось удалить картинку %s", name)
+        return False
+    thumbnails.forget(name)
+    return True
+
+
+def _defer_release(name, delay):
+    if not settings.POST_IMAGE_DEFERRED_RELEASE:
+        return
+    timer = threading.Timer(delay + 1, _release_in_background, [name])
+    timer.daemon = True
+    timer.start()
+
+
+def _release_in_background(name):
+    try:
+        release(name)
+    except Exception:
+        logger.exception("Не удалось удалить картинку %s", name)
+    finally:
+        connection.close()
@@ -0,0 +1,331 @@
+import csv
+import json
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, generations, images, timeline
+from .models import Comment, Follow, Group, Post, User
+
+KINDS = ("users", "groups", "posts", "comments", "follows")
+
+MODELS = {
+    "users": User,
+    "groups": Group,
+    "posts": Post,
+    "comments": Comment,
+    "follows": Follow,
+}
+
+# Сколько ключей кэша сбрасывать за один раз.
+INVALIDATE_CHUNK = 500
+
+# Сколько затронутых пользователей обновлять за один раз в refresh().
+REFRESH_CHUNK = 500
+
+
+def read_rows(stream, fmt):
+    """Построчно читает записи JSONL или CSV в словари.
+
+    Вместо строки JSONL, которую не удалось разобрать, отдаётся None:
+    Importer считает её пропущенной и продолжает загрузку.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def batches(ids, size):
+    """Отсортированные id пачками по size."""
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def parse_date(value):
+    """Дата из ISO 8601; без часового пояса считается UTC."""
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f"Неверная дата: {value}")
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+@contextmanager
+def keep_dates(model):
+    """Отключает auto_now_add, чтобы сохранить даты из источника.
+
+    bulk_create вызывает pre_save полей, и auto_now_add затёр бы
+    pub_date и created текущим временем.
+    """
+    fields = [
+        field
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now_add", False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Потоковая загрузка записей одного вида через bulk_create.
+
+    В памяти держится не больше chunk_size объектов: каждая порция
+    пишется пачками по batch_size в своей транзакции. Внешние ключи
+    разрешаются по словарям username -> id и slug -> id, которые
+    читаются из базы один раз. Посты сохраняют свои id из источника,
+    и комментарии ссылаются на них напрямую.
+
+    Сигналы при bulk_create не срабатывают, поэтому счётчики, ленты
+    подписок, размеры картинок и поколения кэша обновляет refresh().
+
+    processed — сколько записей отправлено в базу, imported — сколько
+    из них добавлено: с ignore_conflicts это изменение числа строк
+    таблицы, ведь уже существующие строки пропускает сама база.
+    """
+
+    def __init__(
+        self, kind, batch_size=1000, chunk_size=10000, ignore_conflicts=False
+    ):
+        if kind not in KINDS:
+            raise ValueError(f"Неизвестный вид записей: {kind}")
+        self.kind = kind
+        self.model = MODELS[kind]
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.ignore_conflicts = ignore_conflicts
+        self.processed = 0
+        self.imported = 0
+        self.skipped = 0
+        self.touched = {
+            "author": set(),
+            "group": set(),
+            "post": set(),
+            "follow": set(),
+        }
+        self._users = None
+        self._groups = None
+
+    @property
+    def users(self):
+        if self._users is None:
+            self._users = dict(
+                User.objects.values_list("username", "pk").iterator()
+            )
+        return self._users
+
+    @property
+    def groups(self):
+        if self._groups is None:
+            self._groups = dict(
+                Group.objects.values_list("slug", "pk").iterator()
+            )
+        return self._groups
+
+    def run(self, rows, progress=None):
+        """Загружает записи; progress(processed, elapsed) вызывается после
+        каждой транзакции."""
+        objects = self._objects(rows)
+        check = getattr(self, f"check_{self.kind}", None)
+        # Django 2.2 не ограничивает заданный batch_size пределами базы,
+        # а SQLite отвергает запрос с лишними параметрами.
+        batch_size = min(
+            self.batch_size,
+            connection.ops.bulk_batch_size(
+                self.model._meta.concrete_fields, [None]
+            ),
+        )
+        started = time.perf_counter()
+        if self.ignore_conflicts:
+            count_before = self.model.objects.count()
+        with keep_dates(self.model):
+            while True:
+                chunk = list(islice(objects, self.chunk_size))
+                if not chunk:
+                    break
+                if check is not None:
+                    chunk = check(chunk)
+                with transaction.atomic():
+                    self.model.objects.bulk_create(
+                        chunk,
+                        batch_size=batch_size,
+                        ignore_conflicts=self.ignore_conflicts,
+                    )
+                self.processed += len(chunk)
+                if progress is not None:
+                    progress(self.processed, time.perf_counter() - started)
+        if self.ignore_conflicts:
+            self.imported = self.model.objects.count() - count_before
+        else:
+            self.imported = self.processed
+        return time.perf_counter() - started
+
+    def _objects(self, rows):
+        build = getattr(self, f"build_{self.kind}")
+        for row in rows:
+            try:
+                instance = build(row)
+            except (KeyError, TypeError, ValueError):
+                instance = None
+            if instance is None:
+                self.skipped += 1
+                continue
+            yield instance
+
+    def build_users(self, row):
+        return User(
+            username=row["username"],
+            first_name=row.get("first_name") or "",
+            last_name=row.get("last_name") or "",
+            email=row.get("email") or "",
+            # Пароль переносится только готовым хешем.
+            password=row.get("password") or make_password(None),
+            date_joined=parse_date(row.get("date_joined")),
+        )
+
+    def build_groups(self, row):
+        return Group(
+            slug=row["slug"],
+            title=row["title"],
+            description=row.get("description") or "",
+        )
+
+    def build_posts(self, row):
+        author_id = self.users.get(row["author"])
+        if author_id is None:
+            return None
+        group_id = None
+        if row.get("group"):
+            group_id = self.groups.get(row["group"])
+            if group_id is None:
+                return None
+        self.touched["author"].add(author_id)
+        if group_id is not None:
+            self.touched["group"].add(group_id)
+        return Post(
+            id=row.get("id") or None,
+            author_id=author_id,
+            group_id=group_id,
+            text=row["text"],
+            pub_date=parse_date(row.get("pub_date")),
+            image=row.get("image") or "",
+        )
+
+    def build_comments(self, row):
+        author_id = self.users.get(row["author"])
+        if author_id is None:
+            return None
+        return Comment(
+            post_id=int(row["post"]),
+            author_id=author_id,
+            text=row["text"],
+            created=parse_date(row.get("created")),
+        )
+
+    def check_comments(self, chunk):
+        """Комментарии порции к существующим постам; остальные
+        пропускаются, а не обрывают транзакцию IntegrityError."""
+        post_ids = list({comment.post_id for comment in chunk})
+        existing = set()
+        for start in range(0, len(post_ids), self.batch_size):
+            existing.update(
+                Post.objects.filter(
+                    pk__in=post_ids[start:start + self.batch_size]
+                ).values_list("pk", flat=True)
+            )
+        checked = [comment for comment in chunk if comment.post_id in existing]
+        self.skipped += len(chunk) - len(checked)
+        self.touched["post"].update(existing)
+        return checked
+
+    def build_follows(self, row):
+        user_id = self.users.get(row["user"])
+        author_id = self.users.get(row["author"])
+        if user_id is None or author_id is None or user_id == author_id:
+            return None
+        self.touched["author"].add(author_id)
+        self.touched["follow"].add(user_id)
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def refresh(self):
+        """Приводит в порядок то, что обычно поддерживают сигналы.
+
+        Обновляется только то, чего коснулась загрузка: счётчики
+        затронутых пользователей и их постов, ленты подписок этих
+        пользователей или подписчиков авторов, размеры картинок постов
+        этих авторов. Пользователи обрабатываются пачками по
+        REFRESH_CHUNK.
+        """
+        if self.kind == "groups":
+            return
+        if self.kind == "users":
+            counters.recount(User.objects.filter(stats__isnull=True))
+        for batch in batches(self._touched_users(), REFRESH_CHUNK):
+            counters.recount(User.objects.filter(pk__in=batch))
+            if self.kind == "follows":
+                timeline.rebuild(User.objects.filter(pk__in=batch))
+            if self.kind == "posts":
+                timeline.rebuild(
+                    User.objects.filter(follower__author__in=batch).distinct()
+                )
+                images.backfill_dimensions(
+                    Post.objects.filter(author__in=batch), self.batch_size
+                )
+        keys = self._stale_keys()
+        while True:
+            chunk = list(islice(keys, INVALIDATE_CHUNK))
+            if not chunk:
+                break
+            generations.invalidate(*chunk)
+
+    def _touched_users(self):
+        if self.kind == "comments":
+            # Счётчики комментариев пересчитываются по авторам постов.
+            authors = set()
+            for batch in batches(self.touched["post"], REFRESH_CHUNK):
+                authors.update(
+                    Post.objects.filter(pk__in=batch).values_list(
+                        "author_id", flat=True
+                    )
+                )
+            return authors
+        return self.touched["author"] | self.touched["follow"]
+
+    def _stale_keys(self):
+        yield generations.generation_key("index")
+        yield generations.generation_key(
+            "table", self.model._meta.label_lower
+        )
+        yield counters.feed_count_key("all")
+        for scope, ids in self.touched.items():
+            for pk in ids:
+                yield generations.generation_key(scope, pk)
+                if scope in ("author", "group"):
+                    yield counters.feed_count_key(scope, pk)
+                if scope == "author":
+                    yield counters.count_generation_key(pk)
+                if scope in ("author", "follow"):
+                    yield generations.generation_key("stats", pk)
+                if scope == "follow":
+                    yield counters.following_key(pk)
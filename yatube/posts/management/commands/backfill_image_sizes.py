@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import backfill_dimensions
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет размеры и размытые копии картинок постов, у которых "
+        "их ещё нет"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Сколько постов обрабатывать за один запрос",
+        )
+
+    def handle(self, *args, **options):
+        filled = backfill_dimensions(Post.objects.all(), options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Размеры картинок заполнены у {filled} постов")
+        )
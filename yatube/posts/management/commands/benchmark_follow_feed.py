@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.follow_feed import ENGINES, get_follow_feed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Сравнивает скорость движков ленты подписок для пользователя"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--page", type=int, default=1)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError("Пользователь не найден")
+        for engine in ENGINES:
+            # Первый прогон прогревает кэш и не учитывается в замерах.
+            self.render_page(user, engine, options["page"])
+            started = time.perf_counter()
+            for _ in range(options["repeat"]):
+                with CaptureQueriesContext(connection) as queries:
+                    self.render_page(user, engine, options["page"])
+            elapsed = (time.perf_counter() - started) / options["repeat"]
+            self.stdout.write(
+                f"{engine:>8}: {elapsed * 1000:8.2f} мс/страница, "
+                f"{len(queries)} запрос(ов)"
+            )
+
+    def render_page(self, user, engine, page):
+        feed = get_follow_feed(user, engine)
+        paginator = Paginator(feed, settings.POSTS_PER_PAGE)
+        return list(paginator.get_page(page).object_list)
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+
+from posts import search
+from posts.models import Post
+
+
+def icontains(query):
+    return Post.objects.filter(text__icontains=query)
+
+
+class Command(BaseCommand):
+    help = "Сравнивает поиск по индексу FTS5 с icontains"
+
+    def add_arguments(self, parser):
+        parser.add_argument("queries", nargs="+")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Полнотекстовый поиск требует SQLite с FTS5")
+        engines = (("fts5", search.search_posts), ("icontains", icontains))
+        for query in options["queries"]:
+            self.stdout.write(f"«{query}»:")
+            for name, engine in engines:
+                # Первый прогон прогревает кэш страниц SQLite.
+                found = self.first_page(engine, query)
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    self.first_page(engine, query)
+                elapsed = (time.perf_counter() - started) / options["repeat"]
+                self.stdout.write(
+                    f"{name:>10}: {elapsed * 1000:8.2f} мс/страница, "
+                    f"найдено {found}"
+                )
+
+    def first_page(self, engine, query):
+        paginator = Paginator(engine(query), settings.POSTS_PER_PAGE)
+        page = paginator.get_page(1)
+        list(page.object_list)
+        return paginator.count
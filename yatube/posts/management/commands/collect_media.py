@@ -0,0 +1,223 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from posts import images, thumbnails
+from posts.models import Post
+
+
+def walk(storage, directory):
+    """Файлы каталога хранилища: пары (имя, os.stat_result).
+
+    Обход ленивый, так что в памяти не держится весь список файлов.
+    """
+    root = storage.path(directory)
+    for path, _, filenames in os.walk(root):
+        for filename in filenames:
+            full_path = os.path.join(path, filename)
+            try:
+                stat = os.stat(full_path)
+            except FileNotFoundError:
+                continue
+            name = os.path.relpath(full_path, storage.location)
+            yield name.replace(os.sep, "/"), stat
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def referenced(names):
+    """Имена из names, на которые ссылаются посты."""
+    return set(
+        Post.objects.filter(image__in=names).values_list("image", flat=True)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет картинки, на которые не ссылается ни один пост, и "
+        "миниатюры, исходники которых удалены"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, что было бы удалено",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Сколько файлов проверять одним запросом",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=100,
+            help="Не больше стольких удалений в секунду; 0 — без ограничения",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=60 * 60,
+            help="Не трогать файлы моложе стольких секунд",
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        self.batch_size = options["batch_size"]
+        self.rate = options["rate"]
+        self.deadline = time.time() - options["min_age"]
+        self.stats = {"originals": 0, "thumbnails": 0, "bytes": 0}
+
+        self.collect_originals()
+        self.collect_sources()
+        self.collect_thumbnails()
+
+        prefix = "Было бы удалено" if self.dry_run else "Удалено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}: картинок {self.stats['originals']}, "
+                f"миниатюр {self.stats['thumbnails']}, "
+                f"байт {self.stats['bytes']}"
+            )
+        )
+
+    def throttle(self, count):
+        if self.rate and count:
+            time.sleep(count / self.rate)
+
+    def collect_originals(self):
+        storage = Post._meta.get_field("image").storage
+        files = (
+            (name, stat)
+            for name, stat in walk(storage, "posts")
+            if stat.st_mtime < self.deadline
+        )
+        for batch in batches(files, self.batch_size):
+            alive = referenced([name for name, _ in batch])
+            deleted = 0
+            for name, stat in batch:
+                if name in alive:
+                    continue
+                # Миниатюры считаются заранее: release удаляет их вместе
+                # с картинкой.
+                generated = self.thumbnails_of(ImageFile(name))
+                if self.dry_run or images.release(name):
+                    self.stats["originals"] += 1
+                    self.stats["thumbnails"] += len(generated)
+                    self.stats["bytes"] += stat.st_size + sum(
+                        size for _, size in generated
+                    )
+                    deleted += 1 + len(generated)
+            if not self.dry_run:
+                self.throttle(deleted)
+
+    def collect_sources(self):
+        # Исходники в хранилище миниатюр: записи thumbnails||<ключ>
+        # перечисляют миниатюры каждого из них.
+        prefix = add_prefix("", "thumbnails")
+        last_key = ""
+        while True:
+            keys = list(
+                KVStore.objects.filter(
+                    key__startswith=prefix, key__gt=last_key
+                )
+                .order_by("key")
+                .values_list("key", flat=True)[: self.batch_size]
+            )
+            if not keys:
+                return
+            last_key = keys[-1]
+            records = KVStore.objects.filter(
+                key__in=[add_prefix(key[len(prefix):]) for key in keys]
+            ).values_list("value", flat=True)
+            sources = [deserialize_image_file(value) for value in records]
+            alive = referenced([source.name for source in sources])
+            deleted = 0
+            for source in sources:
+                # Картинки, файл которых ещё на месте, — забота
+                # collect_originals.
+                if source.name in alive or source.exists():
+                    continue
+                generated = self.thumbnails_of(source)
+                self.stats["thumbnails"] += len(generated)
+                self.stats["bytes"] += sum(size for _, size in generated)
+                deleted += len(generated)
+                if not self.dry_run:
+                    default.kvstore.delete(source)
+                    thumbnails.forget(source.name)
+            if not self.dry_run:
+                self.throttle(deleted)
+
+    def thumbnails_of(self, source):
+        """Пары (имя, размер) миниатюр исходника по записям sorl."""
+        keys = KVStore.objects.filter(
+            key=add_prefix(source.key, "thumbnails")
+        ).values_list("value", flat=True)
+        keys = deserialize(keys[0]) if keys else []
+        result = []
+        for value in KVStore.objects.filter(
+            key__in=[add_prefix(key) for key in keys]
+        ).values_list("value", flat=True):
+            thumbnail = deserialize_image_file(value)
+            try:
+                size = thumbnail.storage.size(thumbnail.name)
+            except OSError:
+                size = 0
+            result.append((thumbnail.name, size))
+        return result
+
+    def collect_thumbnails(self):
+        # Файлы миниатюр, о которых хранилище sorl ничего не знает: их
+        # уже никто не найдёт и не удалит. На них могут ссылаться
+        # сведения о готовых миниатюрах, а чьи это миниатюры, не
+        # узнать, поэтому после удаления забываются все сведения.
+        collected = False
+        storage = default.storage
+        directory = thumbnail_settings.THUMBNAIL_PREFIX
+        files = (
+            (name, stat)
+            for name, stat in walk(storage, directory)
+            if stat.st_mtime < self.deadline
+        )
+        for batch in batches(files, self.batch_size):
+            keys = {
+                add_prefix(ImageFile(name, storage).key): (name, stat)
+                for name, stat in batch
+            }
+            known = set(
+                KVStore.objects.filter(key__in=keys).values_list(
+                    "key", flat=True
+                )
+            )
+            deleted = 0
+            for key, (name, stat) in keys.items():
+                if key in known:
+                    continue
+                if not self.dry_run:
+                    storage.delete(name)
+                self.stats["thumbnails"] += 1
+                self.stats["bytes"] += stat.st_size
+                deleted += 1
+            if not self.dry_run:
+                collected = collected or bool(deleted)
+                self.throttle(deleted)
+        if collected:
+            thumbnails.forget_all()
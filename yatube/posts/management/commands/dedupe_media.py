@@ -0,0 +1,80 @@
+import os
+import re
+import shutil
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import delete
+
+from posts import generations, thumbnails
+from posts.models import Post
+from posts.storage import content_name
+
+HASHED_NAME = re.compile(r"^posts/([0-9a-f]{2})/\1[0-9a-f]{62}\.\w+$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит картинки постов в хранилище по хэшу содержимого, "
+        "оставляя по одному файлу на каждое уникальное содержимое"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать, ничего не меняя",
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field("image").storage
+        self.dry_run = options["dry_run"]
+        self.stats = {"moved": 0, "merged": 0, "freed": 0}
+        # Без изменений на диске пробный прогон помнит, куда перенёс бы
+        # файлы, иначе копии не распознать.
+        self.planned = set()
+        # os.walk отдаёт файлы по мере обхода, так что память не зависит
+        # от числа картинок.
+        for directory, _, filenames in os.walk(storage.path("posts")):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, storage.location)
+                name = name.replace(os.sep, "/")
+                if not HASHED_NAME.match(name):
+                    self.migrate(storage, name, filename)
+        prefix = "Было бы" if self.dry_run else "Готово"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}: перенесено {self.stats['moved']}, "
+                f"удалено копий {self.stats['merged']}, "
+                f"освобождено байт {self.stats['freed']}"
+            )
+        )
+
+    def migrate(self, storage, name, filename):
+        with File(open(storage.path(name), "rb")) as content:
+            target = content_name(f"posts/{filename}", content)
+        duplicate = storage.exists(target) or target in self.planned
+        if duplicate:
+            self.stats["merged"] += 1
+            self.stats["freed"] += storage.size(name)
+        else:
+            self.stats["moved"] += 1
+        if self.dry_run:
+            self.planned.add(target)
+            return
+        if not duplicate:
+            target_path = storage.path(target)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            try:
+                os.link(storage.path(name), target_path)
+            except OSError:
+                shutil.copyfile(storage.path(name), target_path)
+        # Ссылки переключаются до удаления файла: если команду прервать,
+        # посты останутся с рабочими картинками.
+        posts = list(Post.objects.filter(image=name))
+        Post.objects.filter(image=name).update(image=target)
+        delete(name)
+        thumbnails.forget(name)
+        for post in posts:
+            generations.invalidate_post(post)
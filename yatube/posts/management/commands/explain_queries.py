@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from posts import search
+from posts.follow_feed import get_follow_feed
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+# Запросы, которым сортировка во временном дереве нужна по сути:
+# релевантность bm25 известна только после поиска по индексу, а join
+# сливает посты многих авторов — от этого и избавляют движки timeline
+# и merge.
+SORT_EXPECTED = {"search", "follow_join"}
+
+
+def is_bad(detail):
+    """Полный проход по таблице или сортировка во временном дереве."""
+    if "TEMP B-TREE" in detail:
+        return True
+    if "VIRTUAL TABLE" in detail:
+        return False
+    return detail.startswith("SCAN") and "USING" not in detail
+
+
+class Command(BaseCommand):
+    help = "Печатает EXPLAIN QUERY PLAN для основных запросов страниц"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Завершиться с ошибкой, если есть полный проход или "
+            "сортировка во временном дереве",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Команда разбирает планы только SQLite")
+        problems = []
+        for name, queryset in self.queries():
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            bad = [
+                detail
+                for detail in plan
+                if is_bad(detail)
+                and not (name in SORT_EXPECTED and "TEMP B-TREE" in detail)
+            ]
+            if bad:
+                problems.append(name)
+            self.stdout.write(f"{name}: {'ВНИМАНИЕ' if bad else 'OK'}")
+            for detail in plan:
+                self.stdout.write(f"    {detail}")
+        if problems and options["check"]:
+            raise CommandError(
+                "Запросы без подходящего индекса: " + ", ".join(problems)
+            )
+
+    def queries(self):
+        """Пары (имя, QuerySet) в том виде, в каком их строят страницы.
+
+        План не зависит от значений параметров, поэтому берутся любые
+        существующие объекты или заведомо отсутствующие id.
+        """
+        per_page = settings.POSTS_PER_PAGE
+        user = User.objects.first() or User(pk=0)
+        group = Group.objects.first() or Group(pk=0)
+        post = Post.objects.first() or Post(pk=0)
+        now = timezone.now()
+        posts = Post.objects.select_related("author", "group")
+        yield "index", posts[:per_page]
+        yield "index_cursor", posts.order_by("-pub_date", "-pk").filter(
+            Q(pub_date__lt=now) | Q(pub_date=now, pk__lt=post.pk)
+        )[: per_page + 1]
+        yield "group_list", group.posts.select_related("author")[:per_page]
+        yield "profile", Post.objects.filter(author=user).select_related(
+            "group"
+        )[:per_page]
+        yield "post_detail", Post.objects.select_related(
+            "author__stats", "group"
+        ).filter(pk=post.pk)
+        yield "post_comments", Comment.objects.filter(
+            post=post
+        ).select_related("author")
+        yield "follow_timeline", get_follow_feed(user, "timeline")[:per_page]
+        yield "follow_join", get_follow_feed(user, "join")[:per_page]
+        yield "follow_merge", Post.objects.filter(author=user).order_by(
+            "-pub_date", "-pk"
+        )[: settings.RECENT_POSTS_LENGTH]
+        yield "search", search.search_posts("yatube", posts)[:per_page]
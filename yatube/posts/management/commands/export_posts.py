@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import Group
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Выгружает посты автора или группы в JSON или CSV"
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--author", help="Имя пользователя автора")
+        source.add_argument("--group", help="Slug группы")
+        parser.add_argument(
+            "--format", choices=tuple(export.FORMATS), default="json"
+        )
+        parser.add_argument(
+            "--output", help="Файл для выгрузки; по умолчанию stdout"
+        )
+
+    def handle(self, *args, **options):
+        if options["author"]:
+            try:
+                owner = User.objects.get(username=options["author"])
+            except User.DoesNotExist:
+                raise CommandError("Пользователь не найден")
+        else:
+            try:
+                owner = Group.objects.get(slug=options["group"])
+            except Group.DoesNotExist:
+                raise CommandError("Группа не найдена")
+        chunks = export.stream(owner.posts.all(), options["format"])
+        if options["output"] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(
+            options["output"], "w", encoding="utf-8", newline=""
+        ) as stream:
+            stream.writelines(chunks)
+        self.stdout.write(
+            self.style.SUCCESS(f"Посты выгружены в {options['output']}")
+        )
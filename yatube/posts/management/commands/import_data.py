@@ -0,0 +1,85 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import KINDS, Importer, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоково загружает пользователей, группы, посты, комментарии "
+        "или подписки из JSONL или CSV"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=KINDS)
+        parser.add_argument("path", help="Файл с записями или - для stdin")
+        parser.add_argument(
+            "--format",
+            choices=("jsonl", "csv"),
+            help="Формат записей; по умолчанию по расширению файла",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько строк вставлять одним запросом",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Сколько строк записывать в одной транзакции",
+        )
+        parser.add_argument(
+            "--ignore-conflicts",
+            action="store_true",
+            help="Пропускать строки, которые уже есть в базе",
+        )
+        parser.add_argument(
+            "--no-refresh",
+            action="store_true",
+            help="Не пересчитывать счётчики и ленты после загрузки",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"]
+        if fmt is None:
+            fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+        importer = Importer(
+            options["kind"],
+            batch_size=options["batch_size"],
+            chunk_size=options["chunk_size"],
+            ignore_conflicts=options["ignore_conflicts"],
+        )
+        if path == "-":
+            elapsed = importer.run(read_rows(sys.stdin, fmt), self.progress)
+        else:
+            if not os.path.exists(path):
+                raise CommandError(f"Файл {path} не найден")
+            with open(path, encoding="utf-8", newline="") as stream:
+                elapsed = importer.run(read_rows(stream, fmt), self.progress)
+        report = (
+            f"Загружено {importer.imported} записей за {elapsed:.1f} с "
+            f"({self.rate(importer.processed, elapsed)} в секунду), "
+            f"пропущено {importer.skipped}"
+        )
+        if options["ignore_conflicts"]:
+            existed = importer.processed - importer.imported
+            report += f", уже были в базе {existed}"
+        self.stdout.write(self.style.SUCCESS(report))
+        if not options["no_refresh"]:
+            importer.refresh()
+            self.stdout.write("Счётчики, ленты и кэш обновлены")
+
+    def progress(self, processed, elapsed):
+        self.stdout.write(
+            f"  обработано {processed} записей, "
+            f"{self.rate(processed, elapsed)} в секунду"
+        )
+
+    @staticmethod
+    def rate(count, elapsed):
+        return int(count / elapsed) if elapsed else count
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс постов"
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Полнотекстовый поиск требует SQLite с FTS5")
+        search.rebuild()
+        self.stdout.write(
+            f"Индекс поиска пересобран: {Post.objects.count()} постов"
+        )
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает хранимые счётчики постов, комментариев и подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Пересчитать счётчики только этих пользователей",
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options["usernames"]:
+            users = User.objects.filter(username__in=options["usernames"])
+        counters.recount(users)
+        self.stdout.write(self.style.SUCCESS("Счётчики пересчитаны"))
@@ -0,0 +1,75 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def generate(name):
+    """Готовит миниатюры; при ошибке возвращает False, не прерывая работу."""
+    try:
+        return thumbnails.generate(name)
+    except Exception:
+        return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Готовит миниатюры всех картинок постов в геометриях из "
+        "settings.POST_THUMBNAILS, например после смены геометрии"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Число процессов; 1 — готовить в текущем процессе",
+        )
+        parser.add_argument(
+            "--chunksize",
+            type=int,
+            default=20,
+            help="Сколько картинок отдавать процессу за раз",
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image="")
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        if options["workers"] > 1:
+            # Дочерним процессам нельзя наследовать открытые соединения.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                options["workers"], initializer=django.setup
+            ) as pool:
+                results = list(
+                    pool.map(
+                        generate,
+                        names,
+                        chunksize=options["chunksize"],
+                    )
+                )
+        else:
+            results = [generate(name) for name in names]
+        ready = missing = failed = 0
+        for name, record in zip(names, results):
+            if record is None:
+                missing += 1
+            elif record is False:
+                failed += 1
+            else:
+                thumbnails.mark_ready(name, record)
+                ready += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Миниатюры готовы для {ready} картинок, "
+                f"исходных файлов нет: {missing}, ошибок: {failed}"
+            )
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core import stampede
+
+FRAGMENTS = ("page_index", "page_group", "page_profile")
+
+
+class Command(BaseCommand):
+    help = "Показывает, сколько пересчётов фрагментов лент было объединено"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "fragments",
+            nargs="*",
+            default=FRAGMENTS,
+            help="Имена фрагментов, по умолчанию — ленты постов",
+        )
+
+    def handle(self, *args, **options):
+        for name in options["fragments"]:
+            stats = stampede.get_stats(name)
+            self.stdout.write(
+                f"{name}: пересчётов {stats['recomputed']}, "
+                f"из них ранних {stats['early']}, "
+                f"объединено {stats['coalesced']}"
+            )
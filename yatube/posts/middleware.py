@@ -0,0 +1,94 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .generations import get_generations
+
+CACHE_HEADER = "X-Page-Cache"
+
+
+def set_page_tags(request, *scopes):
+    """Помечает страницу поколениями, от которых зависит её содержимое.
+
+    Поколения читаются до рендеринга: если контент поменяется, пока
+    страница собирается, сохранённая копия сразу окажется устаревшей.
+    """
+    request.page_cache_tags = get_generations(scopes)
+    return request.page_cache_tags
+
+
+def page_cache_key(request):
+    """Ключ страницы: схема, хост, путь и отсортированные параметры.
+
+    Схема и хост входят в ключ, потому что в страницах и лентах есть
+    абсолютные адреса.
+    """
+    query = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+    )
+    raw = f"{request.scheme}://{request.get_host()}{request.path}|{query}"
+    return "posts:page:" + hashlib.md5(raw.encode()).hexdigest()
+
+
+def serve_cached(request, response):
+    """Отдаёт сохранённую копию страницы, учитывая условный GET."""
+    response[CACHE_HEADER] = "HIT"
+    return get_conditional_response(
+        request,
+        etag=response.get("ETag"),
+        last_modified=parse_http_date_safe(response.get("Last-Modified", "")),
+        response=response,
+    )
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэширует целые страницы для анонимных GET-запросов.
+
+    Запрос без сессионной куки отдаётся из кэша, минуя сессии,
+    аутентификацию, ORM и шаблоны. Кэшируются только страницы,
+    помеченные set_page_tags; копия считается свежей, пока не сменилось
+    ни одно из её поколений, поэтому сохранение поста или комментария
+    сбрасывает лишь зависящие от них страницы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.is_cacheable(request):
+            return self.get_response(request)
+        key = page_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            tags, response = entry
+            if cache.get_many(tags.keys()) == tags:
+                return serve_cached(request, response)
+        response = self.get_response(request)
+        tags = getattr(request, "page_cache_tags", None)
+        if tags and self.is_storable(request, response):
+            cache.set(key, (tags, response), settings.PAGE_CACHE_TIMEOUT)
+            response[CACHE_HEADER] = "MISS"
+        return response
+
+    @staticmethod
+    def is_cacheable(request):
+        return (
+            request.method in ("GET", "HEAD")
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+
+    @staticmethod
+    def is_storable(request, response):
+        # Страница с фрагментом прежней версии не соответствует своим
+        # поколениям (см. core.stampede.mark_stale).
+        return (
+            not getattr(request, "stale_fragments", False)
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+        )
@@ -0,0 +1,90 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_timelines(apps, schema_editor):
+    # Лента подписок по умолчанию читается из Timeline, поэтому она
+    # заполняется сразу, одним INSERT ... SELECT по подпискам.
+    Timeline = apps.get_model("posts", "Timeline")
+    Follow = apps.get_model("posts", "Follow")
+    Post = apps.get_model("posts", "Post")
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f"INSERT INTO {quote(Timeline._meta.db_table)} "
+        f"({quote('user_id')}, {quote('post_id')}, {quote('pub_date')}) "
+        f"SELECT f.{quote('user_id')}, p.{quote('id')}, "
+        f"p.{quote('pub_date')} "
+        f"FROM {quote(Follow._meta.db_table)} f "
+        f"INNER JOIN {quote(Post._meta.db_table)} p "
+        f"ON p.{quote('author_id')} = f.{quote('author_id')}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0005_auto_20220122_1147"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="follow",
+            unique_together={("user", "author")},
+        ),
+        migrations.CreateModel(
+            name="Timeline",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "pub_date",
+                    models.DateTimeField(verbose_name="Дата публикации поста"),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline_entries",
+                        to="posts.Post",
+                        verbose_name="Пост",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline_entries",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Записи ленты",
+                "ordering": ["-pub_date"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="timeline",
+            index=models.Index(
+                fields=["user", "-pub_date"], name="timeline_user_date_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="timeline",
+            unique_together={("user", "post")},
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
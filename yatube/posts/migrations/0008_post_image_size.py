@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0007_counters"),
+    ]
+
+    # Размеры у существующих постов заполняет команда
+    # backfill_image_sizes: читать все картинки во время migrate долго.
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                editable=False, null=True, verbose_name="Высота картинки"
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                editable=False, null=True, verbose_name="Ширина картинки"
+            ),
+        ),
+    ]
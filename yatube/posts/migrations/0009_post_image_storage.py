@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:37
+
+import posts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0008_post_image_size"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                db_index=True,
+                storage=posts.storage.ContentAddressedStorage(),
+                upload_to="posts/",
+                verbose_name="Картинка",
+            ),
+        ),
+    ]
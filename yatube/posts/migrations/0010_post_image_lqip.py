@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0009_post_image_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_lqip",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Размытая копия картинки",
+            ),
+        ),
+    ]
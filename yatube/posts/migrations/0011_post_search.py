@@ -0,0 +1,50 @@
+from django.db import migrations
+
+TABLE = "posts_post_fts"
+
+# Копия posts.search.SCHEMA на момент миграции. Пересборка таблицы
+# posts_post в SQLite (AlterField и т. п.) удаляет триггеры, после неё
+# нужна команда rebuild_search_index.
+SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    " text, content='posts_post', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON posts_post "
+    f"BEGIN INSERT INTO {TABLE} (rowid, text) VALUES (new.id, new.text); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON posts_post "
+    f"BEGIN INSERT INTO {TABLE} ({TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_au "
+    "AFTER UPDATE OF text ON posts_post "
+    f"BEGIN INSERT INTO {TABLE} ({TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {TABLE} (rowid, text) VALUES (new.id, new.text); END",
+    f"INSERT INTO {TABLE} ({TABLE}) VALUES ('rebuild')",
+)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in SCHEMA:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for suffix in ("ai", "ad", "au"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLE}_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0010_post_image_lqip"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0012_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="timeline",
+            name="timeline_user_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="timeline",
+            index=models.Index(
+                fields=["user", "-pub_date", "-id"],
+                name="timeline_user_date_idx",
+            ),
+        ),
+    ]
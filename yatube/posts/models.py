@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -37,16 +39,58 @@ class Post(models.Model):
         verbose_name="Наименование группы",
         help_text="Выберите группу",
     )
-    image = models.ImageField("Картинка", upload_to="posts/", blank=True)
+    image = models.ImageField(
+        "Картинка",
+        upload_to="posts/",
+        blank=True,
+        db_index=True,
+        storage=ContentAddressedStorage(),
+    )
+    # Размеры картинки заполняются при загрузке (см. signals), чтобы при
+    # выводе не открывать файл. width_field/height_field не подходят:
+    # с ними модель открывает файл при загрузке из базы, пока размеры
+    # не заполнены.
+    image_width = models.PositiveIntegerField(
+        "Ширина картинки", null=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        "Высота картинки", null=True, editable=False
+    )
+    image_lqip = models.TextField(
+        "Размытая копия картинки", blank=True, default="", editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        "Количество комментариев", default=0, editable=False
+    )
 
     class Meta:
         ordering = ["-pub_date"]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        # Ленты автора и группы читаются одним диапазоном индекса
+        # в порядке (pub_date, id) без сортировки во временном дереве.
+        indexes = [
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_date_idx",
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Прочитанные значения нужны сигналам: по ним видно, сменились
+        # ли группа и картинка, без повторного запроса перед save().
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -72,6 +116,11 @@ class Comment(models.Model):
         ordering = ["-created"]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=["post", "-created"], name="comment_post_created_idx"
+            )
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -95,3 +144,68 @@ class Follow(models.Model):
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
         unique_together = ["user", "author"]
+        # Обратный к уникальному индекс: подписчики автора для рассылки
+        # в ленты читаются из него без обращения к таблице.
+        indexes = [
+            models.Index(
+                fields=["author", "user"], name="follow_author_user_idx"
+            )
+        ]
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок.
+
+    Хранит по записи на каждый пост автора, на которого подписан
+    пользователь, чтобы лента читалась одним диапазоном индекса.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пользователь",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пост",
+    )
+    pub_date = models.DateTimeField("Дата публикации поста")
+
+    class Meta:
+        ordering = ["-pub_date"]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        unique_together = ["user", "post"]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-id"],
+                name="timeline_user_date_idx",
+            )
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются сигналами вместо
+    COUNT(*) на каждый запрос."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Пользователь",
+    )
+    posts_count = models.PositiveIntegerField("Количество постов", default=0)
+    followers_count = models.PositiveIntegerField(
+        "Количество подписчиков", default=0
+    )
+    following_count = models.PositiveIntegerField(
+        "Количество подписок", default=0
+    )
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
@@ -0,0 +1,198 @@
+import collections.abc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+def encode_position(date, pk):
+    """Кодирует позицию (дата, id) в непрозрачный токен."""
+    raw = f"{date.isoformat()}|{pk}"
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def encode_cursor(post):
+    """Кодирует позицию поста (pub_date, id) в непрозрачный токен."""
+    return encode_position(post.pub_date, post.pk)
+
+
+def decode_cursor(token):
+    """Возвращает пару (pub_date, id) или None для битого токена."""
+    try:
+        pub_date, pk = urlsafe_base64_decode(token).decode().split("|")
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class CursorPage(collections.abc.Sequence):
+    """Страница, положение которой задаётся курсором, а не номером.
+
+    Номеров и смещений у такой страницы нет, поэтому интерфейс Page
+    она не повторяет: только has_next/has_previous и курсоры соседних
+    страниц. key — строка запроса, по которой страница открыта; шаблоны
+    используют её в ключе кэша вместо номера страницы.
+    """
+
+    def __init__(self, object_list, paginator, key, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.key = key
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f"<CursorPage {self.key}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу (pub_date, id) без OFFSET и COUNT(*).
+
+    Стоимость любой страницы одинакова: это выборка per_page + 1 строк
+    по индексу, начиная с позиции курсора.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list.order_by("-pub_date", "-pk"), per_page)
+
+    def get_page(self, after=None, before=None):
+        if after is not None:
+            position = decode_cursor(after)
+            if position is not None:
+                return self._page_after(position, after)
+        if before is not None:
+            position = decode_cursor(before)
+            if position is not None:
+                return self._page_before(position, before)
+        return self._page_after(None, None)
+
+    def _page_after(self, position, cursor):
+        posts = self.object_list
+        if position is not None:
+            pub_date, pk = position
+            posts = posts.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        posts = list(posts[: self.per_page + 1])
+        return CursorPage(
+            posts[: self.per_page],
+            self,
+            f"a{cursor}" if position is not None else "",
+            has_next=len(posts) > self.per_page,
+            has_previous=position is not None,
+        )
+
+    def _page_before(self, position, cursor):
+        pub_date, pk = position
+        posts = self.object_list.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        ).reverse()
+        posts = list(posts[: self.per_page + 1])
+        has_previous = len(posts) > self.per_page
+        posts = posts[: self.per_page][::-1]
+        return CursorPage(
+            posts,
+            self,
+            f"b{cursor}",
+            has_next=True,
+            has_previous=has_previous,
+        )
+
+
+class WindowedPaginator(Paginator):
+    """Паджинатор, число объектов которого берётся из кэша.
+
+    Счётчик по ключу count_key сдвигается сигналами при создании и
+    удалении постов, так что COUNT(*) выполняется только при промахе.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = self.object_list.order_by().count()
+            cache.set(self.count_key, count, settings.FEED_COUNT_TIMEOUT)
+        return count
+
+    def page_window(self, number):
+        """Номера страниц вокруг текущей, первая и последняя.
+
+        None в списке обозначает пропущенные номера.
+        """
+        last = self.num_pages
+        window = settings.PAGINATOR_WINDOW
+        numbers = {1, last}
+        numbers.update(
+            range(max(1, number - window), min(last, number + window) + 1)
+        )
+        result = []
+        previous = 0
+        for page_number in sorted(numbers):
+            if page_number - previous > 1:
+                result.append(None)
+            result.append(page_number)
+            previous = page_number
+        return result
+
+
+def paginate(request, posts, count_key=None):
+    """Возвращает страницу постов в режиме из settings.POSTS_PAGINATION.
+
+    Курсорный режим работает только с QuerySet: остальные
+    последовательности листаются по номерам страниц. count_key задаёт
+    ключ кэша с числом постов ленты.
+    """
+    cursor_mode = settings.POSTS_PAGINATION == "cursor"
+    if cursor_mode and isinstance(posts, QuerySet):
+        paginator = CursorPaginator(posts, settings.POSTS_PER_PAGE)
+        return paginator.get_page(
+            after=request.GET.get("after"), before=request.GET.get("before")
+        )
+    if not isinstance(posts, QuerySet):
+        count_key = None
+    paginator = WindowedPaginator(posts, settings.POSTS_PER_PAGE, count_key)
+    return paginator.get_page(request.GET.get("page"))
@@ -0,0 +1,98 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Post
+
+TABLE = "posts_post_fts"
+
+# Внешняя таблица FTS5 хранит только индекс, текст берётся из
+# posts_post. Триггеры обновляют индекс при любом изменении постов,
+# в том числе через bulk_create и update, которые не шлют сигналов.
+SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    " text, content='posts_post', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON posts_post "
+    f"BEGIN INSERT INTO {TABLE} (rowid, text) VALUES (new.id, new.text); "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON posts_post "
+    f"BEGIN INSERT INTO {TABLE} ({TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_au "
+    "AFTER UPDATE OF text ON posts_post "
+    f"BEGIN INSERT INTO {TABLE} ({TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {TABLE} (rowid, text) VALUES (new.id, new.text); END",
+)
+
+WORD = re.compile(r"\w+")
+
+
+def is_available():
+    """Полнотекстовый индекс есть только у SQLite."""
+    return connection.vendor == "sqlite"
+
+
+def match_expression(query):
+    """Переводит запрос пользователя в безопасное выражение MATCH.
+
+    Синтаксис FTS5 пользователю не доступен: каждое слово берётся
+    в кавычки и ищется по префиксу, слова объединяются через AND.
+    Пустая строка означает, что искать нечего.
+    """
+    words = WORD.findall(query.lower())[: settings.SEARCH_MAX_TERMS]
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def filter_matching(posts, match):
+    """Оставляет посты, подходящие под выражение MATCH, не меняя порядка.
+
+    RawSQL здесь не годится: в pk__in он оборачивается в лишние скобки
+    и превращается в скалярный подзапрос с одной строкой.
+    """
+    return posts.extra(
+        where=[
+            f"posts_post.id IN (SELECT rowid FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s)"
+        ],
+        params=[match],
+    )
+
+
+def search_posts(query, posts=None):
+    """Посты, подходящие под запрос, от самых релевантных.
+
+    Релевантность считает bm25; при равной релевантности свежие посты
+    идут первыми. Без FTS5 поиск откатывается к icontains по дате.
+    """
+    if posts is None:
+        posts = Post.objects.all()
+    match = match_expression(query)
+    if not match:
+        return posts.none()
+    if not is_available():
+        return posts.filter(text__icontains=query.strip())
+    return posts.extra(
+        select={"rank": f"bm25({TABLE})"},
+        tables=[TABLE],
+        where=[f"{TABLE} MATCH %s", f"{TABLE}.rowid = posts_post.id"],
+        params=[match],
+        order_by=["rank", "-pub_date"],
+    )
+
+
+def install():
+    """Создаёт индекс и триггеры, если их нет."""
+    with connection.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+
+
+def rebuild():
+    """Заново строит индекс по текущему содержимому posts_post."""
+    install()
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
@@ -0,0 +1,168 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    counters,
+    follow_feed,
+    generations,
+    images,
+    thumbnails,
+    timeline,
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+# Поля пользователя, которые выводятся на страницах.
+USER_DISPLAY_FIELDS = {"username", "first_name", "last_name"}
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    if created or raw:
+        return
+    # Вход сохраняет только last_login: имя на страницах не меняется.
+    if update_fields and not USER_DISPLAY_FIELDS & set(update_fields):
+        return
+    generations.invalidate_author(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Follow)
+def table_changed(sender, **kwargs):
+    # Числа строк, закэшированные админкой, устаревают.
+    generations.invalidate(
+        generations.generation_key("table", sender._meta.label_lower)
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        generations.invalidate_group(instance)
+
+
+def _saved_values(post):
+    """Группа и картинка поста в том виде, в каком они лежат в базе.
+
+    Берутся из значений, прочитанных Post.from_db; запрос нужен только
+    для объекта, собранного в памяти или загруженного без этих полей.
+    """
+    loaded = getattr(post, "_loaded_values", {})
+    if "group_id" in loaded and "image" in loaded:
+        return loaded["group_id"], loaded["image"]
+    return (
+        Post.objects.filter(pk=post.pk)
+        .values_list("group_id", "image")
+        .first()
+    ) or (None, None)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    # Запоминаем прежние группу, чтобы перенести пост между счётчиками,
+    # и картинку: миниатюры готовятся только для новой, а прежняя
+    # освобождается.
+    instance._old_group_id = instance._old_image = None
+    if instance.pk is not None and not raw:
+        instance._old_group_id, instance._old_image = _saved_values(instance)
+    if not raw and instance.image.name != instance._old_image:
+        instance.image_width, instance.image_height = images.read_dimensions(
+            instance.image
+        )
+        instance.image_lqip = images.make_lqip(instance.image)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    instance._loaded_values = {
+        "group_id": instance.group_id,
+        "image": instance.image.name,
+    }
+    generations.invalidate_post(instance, instance._old_group_id)
+    if created:
+        timeline.fan_out(instance)
+        follow_feed.forget(instance)
+        counters.bump_user(instance.author_id, "posts_count", 1)
+        counters.bump_feed_counts(instance, 1)
+    elif instance._old_group_id != instance.group_id:
+        counters.move_group_count(instance._old_group_id, instance.group_id)
+    if instance.image.name != instance._old_image:
+        if instance.image:
+            transaction.on_commit(
+                partial(thumbnails.schedule, instance.image.name, instance.pk)
+            )
+        if instance._old_image:
+            transaction.on_commit(
+                partial(images.release, instance._old_image)
+            )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    follow_feed.forget(instance)
+    generations.invalidate_post(instance)
+    counters.bump_user(instance.author_id, "posts_count", -1)
+    counters.bump_feed_counts(instance, -1)
+    if instance.image:
+        transaction.on_commit(partial(images.release, instance.image.name))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    generations.invalidate_comments(instance.post_id)
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    generations.invalidate_comments(instance.post_id)
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance)
+        cache.delete_many(
+            [
+                counters.following_key(instance.user_id),
+                generations.generation_key("follow", instance.user_id),
+                generations.generation_key("stats", instance.user_id),
+                generations.generation_key("stats", instance.author_id),
+            ]
+        )
+        counters.bump_user(instance.author_id, "followers_count", 1)
+        counters.bump_user(instance.user_id, "following_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.trim(instance)
+    cache.delete_many(
+        [
+            counters.following_key(instance.user_id),
+            generations.generation_key("follow", instance.user_id),
+            generations.generation_key("stats", instance.user_id),
+            generations.generation_key("stats", instance.author_id),
+        ]
+    )
+    counters.bump_user(instance.author_id, "followers_count", -1)
+    counters.bump_user(instance.user_id, "following_count", -1)
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_name(name, content):
+    """Имя файла по SHA-256 содержимого: posts/ab/abcd….jpg.
+
+    Каталог и расширение берутся из name, содержимое читается
+    кусками и в память целиком не загружается.
+    """
+    digest = hashlib.sha256()
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    digest = digest.hexdigest()
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(directory, digest[:2], digest + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, где одинаковые файлы хранятся один раз.
+
+    Имя файла — хэш его содержимого, поэтому повторная загрузка той же
+    картинки возвращает имя уже сохранённого файла. Один файл может
+    принадлежать нескольким постам: удалять его можно, только когда
+    ссылок на него не осталось (см. posts.images.release).
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = content_name(name, content)
+        if self.exists(name):
+            # Свежее время изменения защищает файл от удаления
+            # release, пока пост с новой ссылкой ещё не сохранён.
+            os.utime(self.path(name))
+            return name
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        # Две одинаковые загрузки могут дойти сюда одновременно. Файл
+        # пишется под временным именем и переносится на место целиком:
+        # содержимое у обоих одно, поэтому перезапись безвредна, а
+        # копии с суффиксом от get_available_name не появляется.
+        directory, filename = os.path.split(name)
+        temp_name = super()._save(
+            os.path.join(directory, f".{uuid.uuid4().hex}-{filename}"),
+            content,
+        )
+        os.replace(self.path(temp_name), self.path(name))
+        return name
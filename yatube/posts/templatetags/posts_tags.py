@@ -0,0 +1,35 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page_obj):
+    """Номера страниц для ссылок паджинатора; None — пропуск."""
+    paginator = page_obj.paginator
+    if hasattr(paginator, "page_window"):
+        return paginator.page_window(page_obj.number)
+    return paginator.page_range
+
+
+@register.filter
+def page_key(page_obj):
+    """Часть ключа кэша ленты: номер страницы или её курсор."""
+    if hasattr(page_obj, "key"):
+        return page_obj.key
+    return page_obj.number
+
+
+@register.simple_tag
+def post_thumbnail(post, geometry, page_thumbnails=None):
+    """Миниатюра картинки поста из settings.POST_THUMBNAILS.
+
+    page_thumbnails — PageThumbnails ленты: с ним сведения о миниатюрах
+    всей страницы берутся из кэша одним запросом. Пока миниатюра
+    готовится в фоне, вместо неё отдаётся заглушка того же размера.
+    """
+    if page_thumbnails:
+        return page_thumbnails.get(post, geometry)
+    return thumbnails.thumbnail(post, geometry)
@@ -3,7 +3,7 @@ from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from ..models import Post
+from ..models import Follow, Group, Post
 
 User = get_user_model()
 
@@ -24,14 +24,70 @@ class PostCacheTest(TestCase):
         self.author_client = Client()
         self.author_client.force_login(self.user)
 
-    def test_new_post_not_in_cache(self):
-        """Проверка того, что удаленный пост остается в кэше"""
+    def test_deleted_post_leaves_cache_at_once(self):
+        """Проверка того, что удаленный пост сразу пропадает из кэша"""
         new_post = Post.objects.create(author=self.user, text="New post")
         first_response = self.author_client.get(reverse("posts:index"))
         self.assertEqual(first_response.context["page_obj"][0], new_post)
         Post.objects.filter(pk=new_post.id).delete()
         second_response = self.author_client.get(reverse("posts:index"))
-        self.assertEqual(first_response.content, second_response.content)
+        self.assertNotEqual(first_response.content, second_response.content)
+        self.assertNotContains(second_response, "New post")
+
+    def test_unchanged_feed_served_from_cache(self):
+        """Проверка того, что лента без изменений отдается из кэша"""
+        cache.clear()
+        self.author_client.get(reverse("posts:index"))
+        # Обновление в обход сигналов не сбрасывает поколение ленты
+        Post.objects.filter(pk=self.post.pk).update(text="Changed post")
+        response = self.author_client.get(reverse("posts:index"))
+        self.assertNotContains(response, "Changed post")
+        Post.objects.get(pk=self.post.pk).save()
+        response = self.author_client.get(reverse("posts:index"))
+        self.assertContains(response, "Changed post")
+
+    def test_new_comment_refreshes_post_comments(self):
+        """Проверка того, что новый комментарий сразу виден на странице
+        поста"""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        self.author_client.get(url)
+        self.author_client.post(
+            reverse("posts:add_comment", kwargs={"post_id": self.post.pk}),
+            data={"text": "Fresh comment"},
+        )
+        self.assertContains(self.author_client.get(url), "Fresh comment")
+
+    def test_renamed_group_and_author_leave_cache(self):
+        """Проверка того, что новые названия группы и имя автора сразу
+        видны в закэшированных лентах"""
+        cache.clear()
+        group = Group.objects.create(title="Old group", slug="renamed")
+        Post.objects.create(author=self.user, group=group, text="In group")
+        pages = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": group.slug}),
+            reverse("posts:profile", kwargs={"username": self.user}),
+        )
+        for url in pages:
+            self.author_client.get(url)
+        group.title = "New group"
+        group.save()
+        self.user.first_name = "Renamed"
+        self.user.save()
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.author_client.get(url)
+                self.assertContains(response, "New group")
+                self.assertContains(response, "Renamed")
+
+    def test_follow_feed_sees_new_post_of_followed_author(self):
+        """Проверка обновления ленты подписок по поколению автора"""
         cache.clear()
-        third_response = self.author_client.get(reverse("posts:index"))
-        self.assertNotEqual(new_post, third_response.context["page_obj"][0])
+        reader = User.objects.create_user(username="reader")
+        Follow.objects.create(user=reader, author=self.user)
+        client = Client()
+        client.force_login(reader)
+        url = reverse("posts:follow_index")
+        client.get(url)
+        Post.objects.create(author=self.user, text="Fresh post")
+        self.assertContains(client.get(url), "Fresh post")
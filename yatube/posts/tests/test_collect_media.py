@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from .. import thumbnails
+from ..models import Post
+from .test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CollectMediaTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        # Записи sorl кэшируются: без очистки миниатюры прошлого теста
+        # нашлись бы в кэше, а не в базе.
+        cache.clear()
+        user = User.objects.create_user(username="auth")
+        self.post = Post(author=user, text="Post")
+        self.post.image.save("used.gif", ContentFile(SMALL_GIF))
+        storage = self.post.image.storage
+        self.orphan = storage.save(
+            "posts/orphan.gif", ContentFile(SMALL_GIF + b"\x00")
+        )
+        self.used_thumbnails = self.thumbnails(self.post.image.name)
+        self.orphan_thumbnails = self.thumbnails(self.orphan)
+        # Миниатюры картинки без поста и лишний файл в каталоге миниатюр.
+        self.report = (
+            f"картинок 1, миниатюр {len(self.orphan_thumbnails) + 1}"
+        )
+        self.stray = storage.save("cache/stray.jpg", ContentFile(b"stray"))
+        past = time.time() - 2 * 60 * 60
+        for name in self.files():
+            os.utime(os.path.join(TEMP_MEDIA_ROOT, name), (past, past))
+
+    def tearDown(self):
+        for directory in ("posts", "cache"):
+            shutil.rmtree(
+                os.path.join(TEMP_MEDIA_ROOT, directory), ignore_errors=True
+            )
+
+    def thumbnails(self, name):
+        return {record[0] for record in thumbnails.generate(name).values()}
+
+    def files(self):
+        return {
+            os.path.relpath(os.path.join(directory, filename), TEMP_MEDIA_ROOT)
+            for directory, _, filenames in os.walk(TEMP_MEDIA_ROOT)
+            for filename in filenames
+        }
+
+    def test_dry_run_reports_without_deleting(self):
+        """Проверка отчёта пробного прогона"""
+        files = self.files()
+        out = StringIO()
+        call_command("collect_media", "--dry-run", stdout=out)
+        self.assertIn(self.report, out.getvalue())
+        self.assertEqual(self.files(), files)
+
+    def test_orphans_are_deleted(self):
+        """Проверка удаления картинок без постов и лишних миниатюр"""
+        out = StringIO()
+        call_command("collect_media", "--rate=0", stdout=out)
+        self.assertIn(self.report, out.getvalue())
+        self.assertEqual(
+            self.files(), {self.post.image.name} | self.used_thumbnails
+        )
+
+    def test_young_files_are_kept(self):
+        """Проверка, что свежие файлы не удаляются"""
+        os.utime(os.path.join(TEMP_MEDIA_ROOT, self.orphan))
+        call_command("collect_media", "--rate=0", stdout=StringIO())
+        self.assertIn(self.orphan, self.files())
+        self.assertLessEqual(self.orphan_thumbnails, self.files())
+
+    def test_ready_records_of_collected_files_are_forgotten(self):
+        """Проверка, что сведения об удалённых миниатюрах забываются"""
+        names = (self.post.image.name, self.orphan)
+        for name in names:
+            thumbnails.mark_ready(name, thumbnails.generate(name))
+        os.remove(os.path.join(TEMP_MEDIA_ROOT, self.stray))
+        call_command("collect_media", "--rate=0", stdout=StringIO())
+        self.assertEqual(
+            set(thumbnails.get_records(names)), {self.post.image.name}
+        )
+
+    def test_ready_records_of_missing_sources_are_forgotten(self):
+        """Проверка сведений о миниатюрах картинки, удалённой в обход"""
+        thumbnails.mark_ready(self.orphan, thumbnails.generate(self.orphan))
+        os.remove(os.path.join(TEMP_MEDIA_ROOT, self.stray))
+        os.remove(os.path.join(TEMP_MEDIA_ROOT, self.orphan))
+        call_command("collect_media", "--rate=0", stdout=StringIO())
+        self.assertFalse(thumbnails.is_ready(self.orphan))
+
+    def test_stray_thumbnails_forget_all_records(self):
+        """Проверка, что после удаления лишних миниатюр сведения сброшены"""
+        name = self.post.image.name
+        thumbnails.mark_ready(name, thumbnails.generate(name))
+        call_command("collect_media", "--rate=0", stdout=StringIO())
+        self.assertFalse(thumbnails.is_ready(name))
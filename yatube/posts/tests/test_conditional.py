@@ -0,0 +1,115 @@
+import time
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..generations import generation_key
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(title="Group", slug="group")
+        cls.post = Post.objects.create(
+            author=cls.author, text="Test post", group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": self.author}),
+            reverse("posts:follow_index"),
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk}),
+        ]
+
+    def revalidate(self, client, url, response):
+        return client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Проверка ответа 304 для неизменившихся страниц"""
+        for client in (Client(), self.reader_client):
+            for url in self.urls[:3] + self.urls[4:]:
+                with self.subTest(url=url):
+                    response = client.get(url)
+                    self.assertEqual(
+                        self.revalidate(client, url, response).status_code,
+                        HTTPStatus.NOT_MODIFIED,
+                    )
+
+    def test_not_modified_skips_rendering(self):
+        """Проверка того, что ответ 304 отдается без шаблонов"""
+        response = self.reader_client.get(self.urls[3])
+        response = self.revalidate(self.reader_client, self.urls[3], response)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.templates, [])
+
+    def test_changed_content_returns_full_page(self):
+        """Проверка того, что новый пост или комментарий обновляет
+        валидаторы"""
+        responses = {url: self.reader_client.get(url) for url in self.urls}
+        Post.objects.create(author=self.author, text="New", group=self.group)
+        Comment.objects.create(post=self.post, author=self.author, text="C")
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.revalidate(self.reader_client, url, response)
+                    .status_code,
+                    HTTPStatus.OK,
+                )
+
+    def test_etag_differs_between_users(self):
+        """Проверка того, что гость и читатель получают разные ETag"""
+        url = self.urls[0]
+        self.assertNotEqual(
+            Client().get(url)["ETag"], self.reader_client.get(url)["ETag"]
+        )
+
+    def test_last_modified_waits_for_the_second_to_pass(self):
+        """Проверка того, что Last-Modified не отдается в ту же секунду,
+        что и изменение, а позже позволяет ответить 304"""
+        url = self.urls[0]
+        response = Client().get(url)
+        self.assertFalse(response.has_header("Last-Modified"))
+        cache.clear()
+        cache.set(generation_key("index"), time.time_ns() - 5 * 10**9, None)
+        response = Client().get(url)
+        self.assertTrue(response.has_header("Last-Modified"))
+        revalidated = Client().get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(revalidated.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.author, text="Same second")
+        fresh = Client().get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(fresh.status_code, HTTPStatus.OK)
+
+    def test_etag_changes_with_csrf_token(self):
+        """Проверка того, что новый вход меняет ETag страницы с формой"""
+        url = self.urls[4]
+        response = self.reader_client.get(url)
+        self.assertEqual(
+            self.revalidate(self.reader_client, url, response).status_code,
+            HTTPStatus.NOT_MODIFIED,
+        )
+        self.reader_client.logout()
+        self.reader_client.force_login(self.reader)
+        self.reader_client.cookies.pop("csrftoken", None)
+        self.assertEqual(
+            self.revalidate(self.reader_client, url, response).status_code,
+            HTTPStatus.OK,
+        )
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..counters import follow_count_key
+from ..models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.user = User.objects.create_user(username="user")
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_signals_keep_counters_in_sync(self):
+        """Проверка обновления счётчиков при создании и удалении объектов"""
+        post = Post.objects.create(author=self.author, text="Post")
+        comment = Comment.objects.create(
+            post=post, author=self.user, text="Comment"
+        )
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_recount_command_repairs_drift(self):
+        """Проверка исправления расхождений командой recount"""
+        post = Post.objects.create(author=self.author, text="Post")
+        Comment.objects.create(post=post, author=self.user, text="Comment")
+        Follow.objects.create(user=self.user, author=self.author)
+        UserStats.objects.all().delete()
+        Post.objects.update(comments_count=7)
+        call_command("recount", stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+
+    def test_follow_count_key_follows_authors(self):
+        """Проверка смены ключа размера ленты подписок без обхода
+        подписчиков"""
+        cache.clear()
+        stranger = User.objects.create_user(username="stranger")
+        Follow.objects.create(user=self.user, author=self.author)
+        key = follow_count_key(self.user.pk)
+        self.assertEqual(follow_count_key(self.user.pk), key)
+        Post.objects.create(author=stranger, text="Чужой пост")
+        self.assertEqual(follow_count_key(self.user.pk), key)
+        Post.objects.create(author=self.author, text="Новый пост")
+        fresh = follow_count_key(self.user.pk)
+        self.assertNotEqual(fresh, key)
+        Follow.objects.create(user=self.user, author=stranger)
+        self.assertNotEqual(follow_count_key(self.user.pk), fresh)
+
+    def test_post_update_reads_previous_values_without_query(self):
+        """Проверка того, что сохранение загруженного поста не читает
+        его прежнюю версию из базы"""
+        Post.objects.create(author=self.author, text="Post")
+        post = Post.objects.get()
+        post.text = "Edited"
+        with CaptureQueriesContext(connection) as queries:
+            post.save()
+        selects = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "posts_post"')
+        ]
+        self.assertEqual(selects, [])
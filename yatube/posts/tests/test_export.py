@@ -0,0 +1,90 @@
+import csv
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(EXPORT_BATCH_SIZE=2)
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f"Пост {number}",
+            )
+            for number in range(5)
+        ]
+        cls.posts[0].image = "posts/ab/picture.jpg"
+        cls.posts[0].save()
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text="Комментарий"
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def download(self, url, fmt):
+        response = self.client.get(url, {"format": fmt})
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_profile_export_json(self):
+        """Проверка выгрузки постов автора в JSON"""
+        url = reverse("posts:profile_export", args=[self.author.username])
+        # Сессия, пользователь, автор и по запросу постов и комментариев
+        # на каждую из трёх пачек.
+        with self.assertNumQueries(9):
+            rows = json.loads(self.download(url, "json"))
+        self.assertEqual(
+            [row["id"] for row in rows], [p.pk for p in self.posts]
+        )
+        first = rows[0]
+        self.assertEqual(first["author"], "author")
+        self.assertIsNone(first["group"])
+        self.assertEqual(
+            first["image"], "http://testserver/media/posts/ab/picture.jpg"
+        )
+        self.assertEqual(first["comments"][0]["author"], "reader")
+        self.assertEqual(rows[1]["group"], "group")
+
+    def test_group_export_csv(self):
+        """Проверка выгрузки постов группы в CSV"""
+        url = reverse("posts:group_export", args=[self.group.slug])
+        response = self.client.get(url, {"format": "csv"})
+        self.assertIn("group-posts.csv", response["Content-Disposition"])
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["text"], "Пост 1")
+        self.assertEqual(json.loads(rows[0]["comments"]), [])
+
+    def test_export_requires_login_and_known_format(self):
+        """Проверка доступа к выгрузке и проверки формата"""
+        url = reverse("posts:profile_export", args=[self.author.username])
+        self.assertEqual(
+            self.client.get(url, {"format": "xml"}).status_code, 404
+        )
+        response = Client().get(url)
+        self.assertRedirects(response, f"/auth/login/?next={url}")
+
+    def test_export_command(self):
+        """Проверка команды выгрузки постов"""
+        out = StringIO()
+        call_command("export_posts", "--group=group", stdout=out)
+        rows = json.loads(out.getvalue())
+        self.assertEqual([row["text"] for row in rows], ["Пост 1", "Пост 3"])
@@ -0,0 +1,96 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username="author", first_name="Лев", last_name="Толстой"
+        )
+        cls.group = Group.objects.create(title="Книги", slug="books")
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Война и мир"
+        )
+        Post.objects.create(author=cls.author, text="Без группы")
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username="reader")
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feeds_list_posts(self):
+        """Проверка содержимого RSS- и Atom-лент"""
+        cases = (
+            ("posts:feed", (), "application/rss+xml", 2),
+            ("posts:feed_atom", (), "application/atom+xml", 2),
+            ("posts:group_feed", (self.group.slug,), "application/rss", 1),
+            ("posts:profile_feed_atom", (self.author.username,), "atom", 2),
+        )
+        for name, args, content_type, count in cases:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=args))
+                self.assertIn(content_type, response["Content-Type"])
+                self.assertContains(response, "Война и мир")
+                self.assertContains(response, "Лев Толстой")
+                self.assertContains(
+                    response,
+                    reverse("posts:post_detail", args=[self.post.pk]),
+                )
+                tag = "<entry>" if "atom" in name else "<item>"
+                self.assertContains(response, tag, count)
+
+    @override_settings(ALLOWED_HOSTS=["testserver", "other.example.com"])
+    def test_cached_feed_is_per_host(self):
+        """Проверка, что копия ленты не отдаётся другому хосту"""
+        url = reverse("posts:feed")
+        self.client.get(url)
+        response = self.client.get(url, HTTP_HOST="other.example.com")
+        self.assertContains(response, "http://other.example.com/")
+        self.assertNotContains(response, "http://testserver/")
+        response = self.client.get(url, secure=True)
+        self.assertContains(response, "https://testserver/")
+
+    def test_unknown_group_feed(self):
+        """Проверка ответа 404 для ленты несуществующей группы"""
+        response = self.client.get(reverse("posts:group_feed", args=["no"]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_poll_without_changes_is_cheap(self):
+        """Проверка, что повторный опрос ленты идёт из кэша и отдаёт 304"""
+        url = reverse("posts:group_feed", args=[self.group.slug])
+        response = self.client.get(url)
+        # Только поиск группы по slug: сессия и пользователь ленте
+        # не нужны.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).content, response.content)
+        with self.assertNumQueries(1):
+            revalidated = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(revalidated.status_code, HTTPStatus.NOT_MODIFIED)
+        # ETag не зависит от читателя.
+        self.assertEqual(
+            Client().get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code,
+            HTTPStatus.NOT_MODIFIED,
+        )
+
+    def test_new_post_refreshes_feed(self):
+        """Проверка, что новый пост сбрасывает закэшированную ленту"""
+        url = reverse("posts:feed")
+        response = self.client.get(url)
+        Post.objects.create(author=self.author, text="Анна Каренина")
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(fresh.status_code, HTTPStatus.OK)
+        self.assertContains(fresh, "Анна Каренина")
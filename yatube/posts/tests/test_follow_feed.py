@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..follow_feed import ENGINES, get_follow_feed
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowFeedEngineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="user")
+        cls.authors = [
+            User.objects.create_user(username=f"author_{i}") for i in range(3)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+        cls.stranger = User.objects.create_user(username="stranger")
+        for i in range(12):
+            Post.objects.create(author=cls.authors[i % 3], text=f"Post {i}")
+        Post.objects.create(author=cls.stranger, text="Not followed")
+
+    def setUp(self):
+        cache.clear()
+
+    def feed_ids(self, engine):
+        return [post.pk for post in get_follow_feed(self.user, engine)[:20]]
+
+    def test_engines_return_same_feed(self):
+        """Проверка того, что все движки собирают одинаковую ленту"""
+        expected = self.feed_ids("join")
+        self.assertEqual(len(expected), 12)
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(self.feed_ids(engine), expected)
+
+    def test_merge_feed_tracks_new_and_deleted_posts(self):
+        """Проверка обновления кэша авторов при создании и удалении
+        поста"""
+        self.feed_ids("merge")
+        post = Post.objects.create(author=self.authors[0], text="Fresh")
+        self.assertEqual(self.feed_ids("merge")[0], post.pk)
+        post.delete()
+        self.assertEqual(self.feed_ids("merge"), self.feed_ids("join"))
+
+    def test_merge_feed_loads_cold_cache_in_one_query(self):
+        """Проверка загрузки списков всех авторов одним запросом"""
+        # Подписки, списки авторов и посты среза.
+        with self.assertNumQueries(3):
+            self.feed_ids("merge")
+        with self.assertNumQueries(2):
+            self.feed_ids("merge")
+
+    @override_settings(RECENT_POSTS_LENGTH=2)
+    def test_merge_feed_stops_at_horizon(self):
+        """Проверка того, что лента не показывает посты старше самого
+        свежего из обрезанных списков авторов"""
+        ids = self.feed_ids("merge")
+        self.assertEqual(ids, self.feed_ids("join")[: len(ids)])
+        self.assertLess(len(ids), 12)
+
+    @override_settings(FOLLOW_FEED_ENGINE="merge")
+    def test_follow_index_uses_merge_engine(self):
+        """Проверка паджинации ленты подписок на движке merge"""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse("posts:follow_index") + "?page=2")
+        self.assertEqual(len(response.context["page_obj"]), 2)
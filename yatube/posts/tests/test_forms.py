@@ -1,12 +1,22 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase
+from django.test.utils import override_settings
 from django.urls import reverse
 
+from PIL import Image
+
 from ..models import Group, Post
 
 User = get_user_model()
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
 
 class PostFormsTest(TestCase):
     @classmethod
@@ -103,3 +113,74 @@ class PostFormsTest(TestCase):
         comment = response.context["comments"][0]
         self.assertEqual(comment.text, form_data["text"])
         self.assertEqual(comment.post, self.post)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_MAX_SIDE=100,
+    POST_IMAGE_MAX_PIXELS=1000 * 1000,
+)
+class PostImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def upload(self, size, image_format="PNG", **params):
+        buffer = BytesIO()
+        Image.new("RGBA", size, (255, 0, 0, 128)).convert(
+            "RGBA" if image_format == "PNG" else "RGB"
+        ).save(buffer, image_format, **params)
+        return SimpleUploadedFile(
+            name=f"photo.{image_format.lower()}",
+            content=buffer.getvalue(),
+            content_type=f"image/{image_format.lower()}",
+        )
+
+    def test_uploaded_image_is_normalized(self):
+        """Проверка уменьшения и перекодирования загруженной картинки"""
+        exif = Image.Exif()
+        exif[0x0110] = "Phone camera"
+        self.author_client.post(
+            reverse("posts:post_create"),
+            data={
+                "text": "Photo",
+                "image": self.upload((400, 200), "JPEG", exif=exif),
+            },
+        )
+        post = Post.objects.get(text="Photo")
+        self.assertTrue(post.image.name.endswith(".jpg"))
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_transparent_image_is_flattened(self):
+        """Проверка перекодирования картинки с прозрачностью в JPEG"""
+        self.author_client.post(
+            reverse("posts:post_create"),
+            data={"text": "Alpha", "image": self.upload((10, 10))},
+        )
+        post = Post.objects.get(text="Alpha")
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.mode, "RGB")
+
+    def test_oversized_image_is_rejected(self):
+        """Проверка отказа для картинки с чрезмерным числом пикселей"""
+        response = self.author_client.post(
+            reverse("posts:post_create"),
+            data={"text": "Bomb", "image": self.upload((2000, 600))},
+        )
+        self.assertFormError(
+            response, "form", "image", "Картинка слишком велика: 2000×600"
+        )
+        self.assertFalse(Post.objects.filter(text="Bomb").exists())
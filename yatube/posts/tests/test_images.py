@@ -0,0 +1,129 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..models import Post
+from .test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageSizeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text="Test post",
+            image=SimpleUploadedFile(
+                name="small.gif", content=SMALL_GIF, content_type="image/gif"
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_size_is_stored_on_upload(self):
+        """Проверка сохранения размеров картинки при загрузке"""
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (2, 1)
+        )
+
+    def test_missing_file_leaves_size_empty(self):
+        """Проверка поста, файл картинки которого не найден"""
+        post = Post.objects.create(
+            author=self.user, text="Missing", image="posts/missing.gif"
+        )
+        post = Post.objects.get(pk=post.pk)
+        self.assertIsNone(post.image_width)
+        self.assertIsNone(post.image_height)
+
+    def test_backfill_command(self):
+        """Проверка заполнения размеров у старых постов"""
+        Post.objects.create(
+            author=self.user, text="Missing", image="posts/missing.gif"
+        )
+        Post.objects.update(image_width=None, image_height=None)
+        out = StringIO()
+        call_command("backfill_image_sizes", "--batch-size=1", stdout=out)
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (2, 1)
+        )
+        self.assertIn("у 1 постов", out.getvalue())
+
+    def test_lqip_is_stored_on_upload(self):
+        """Проверка сохранения размытой копии картинки при загрузке"""
+        self.post.refresh_from_db()
+        self.assertTrue(
+            self.post.image_lqip.startswith("data:image/jpeg;base64,")
+        )
+
+    def test_feed_renders_responsive_image(self):
+        """Проверка размеров, srcset и размытой копии миниатюры в ленте"""
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, "320w, ")
+        self.assertContains(response, "640w, ")
+        self.assertContains(response, "960w")
+        self.assertContains(response, 'loading="eager"')
+        self.assertContains(response, "background: url('data:image/jpeg")
+
+    def test_rendered_size_comes_from_stored_columns(self):
+        """Проверка, что размеры тега img берутся из полей поста"""
+        name = self.post.image.name
+        record = thumbnails.generate(name)
+        # Сведения о миниатюрах с чужими размерами не должны попасть
+        # в страницу: размеры считаются по image_width и image_height.
+        thumbnails.mark_ready(
+            name,
+            {
+                variant: (thumbnail_name, 1, 1)
+                for variant, (thumbnail_name, _, _) in record.items()
+            },
+        )
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, "320w, ")
+
+    def test_display_size(self):
+        """Проверка расчёта размера миниатюры по размерам картинки"""
+        post = Post(image="posts/a.gif", image_width=2000, image_height=1000)
+        cases = (
+            ({"crop": "center"}, (960, 339)),
+            ({}, (678, 339)),
+            ({"upscale": False}, (678, 339)),
+        )
+        for options, size in cases:
+            with self.subTest(options=options):
+                self.assertEqual(
+                    thumbnails.display_size(post, "960x339", options), size
+                )
+        small = Post(image="posts/a.gif", image_width=200, image_height=100)
+        self.assertEqual(
+            thumbnails.display_size(small, "960x339", {"upscale": False}),
+            (200, 100),
+        )
+        self.assertIsNone(
+            thumbnails.display_size(Post(image="posts/a.gif"), "960x339", {})
+        )
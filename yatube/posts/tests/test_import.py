@@ -0,0 +1,170 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, Timeline, UserStats
+
+User = get_user_model()
+
+
+class ImportDataTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(content)
+        return path
+
+    def write_jsonl(self, name, rows):
+        return self.write(
+            name, "".join(json.dumps(row) + "\n" for row in rows)
+        )
+
+    def load(self, kind, path, *args):
+        out = StringIO()
+        call_command("import_data", kind, path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_keeps_dates_and_refreshes_counters(self):
+        """Проверка загрузки всех видов записей с исходными датами"""
+        self.load(
+            "users",
+            self.write(
+                "users.csv",
+                "username,first_name,date_joined\n"
+                "leo,Лев,2020-01-01T00:00:00\n"
+                "anna,Анна,2020-01-02T00:00:00\n",
+            ),
+        )
+        self.load(
+            "groups",
+            self.write_jsonl(
+                "groups.jsonl", [{"slug": "books", "title": "Книги"}]
+            ),
+        )
+        output = self.load(
+            "posts",
+            self.write_jsonl(
+                "posts.jsonl",
+                [
+                    {
+                        "id": 10,
+                        "author": "leo",
+                        "group": "books",
+                        "text": "Война и мир",
+                        "pub_date": "1869-01-01T12:00:00+00:00",
+                    },
+                    {"id": 11, "author": "leo", "text": "Анна Каренина"},
+                    {"id": 12, "author": "nobody", "text": "Пропуск"},
+                ],
+            ),
+        )
+        self.assertIn("Загружено 2 записей", output)
+        self.assertIn("пропущено 1", output)
+        self.load(
+            "comments",
+            self.write_jsonl(
+                "comments.jsonl",
+                [
+                    {
+                        "post": 10,
+                        "author": "anna",
+                        "text": "Длинно",
+                        "created": "1870-01-01T00:00:00Z",
+                    }
+                ],
+            ),
+        )
+        self.load(
+            "follows",
+            self.write_jsonl(
+                "follows.jsonl", [{"user": "anna", "author": "leo"}]
+            ),
+        )
+
+        post = Post.objects.get(pk=10)
+        self.assertEqual(
+            post.pub_date, datetime(1869, 1, 1, 12, tzinfo=timezone.utc)
+        )
+        self.assertEqual(post.group.slug, "books")
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().created.year, 1870)
+        self.assertFalse(
+            User.objects.get(username="leo").has_usable_password()
+        )
+        leo = UserStats.objects.get(user__username="leo")
+        self.assertEqual(leo.posts_count, 2)
+        self.assertEqual(leo.followers_count, 1)
+        self.assertEqual(
+            Timeline.objects.filter(user__username="anna").count(), 2
+        )
+        self.assertTrue(Follow.objects.filter(author__username="leo").exists())
+
+    def test_import_writes_in_chunks(self):
+        """Проверка загрузки порциями и пропуска существующих строк"""
+        Group.objects.create(slug="group_0", title="Старая")
+        path = self.write_jsonl(
+            "groups.jsonl",
+            [{"slug": f"group_{i}", "title": f"Группа {i}"} for i in range(5)],
+        )
+        output = self.load(
+            "groups",
+            path,
+            "--chunk-size=2",
+            "--batch-size=1",
+            "--ignore-conflicts",
+        )
+        self.assertEqual(output.count("в секунду"), 4)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(Group.objects.get(slug="group_0").title, "Старая")
+        self.assertIn("Загружено 4 записей", output)
+        self.assertIn("уже были в базе 1", output)
+
+    def test_bad_rows_are_skipped(self):
+        """Проверка пропуска битых строк и комментариев к чужим постам"""
+        author = User.objects.create_user(username="leo")
+        post = Post.objects.create(author=author, text="Пост")
+        path = self.write(
+            "comments.jsonl",
+            json.dumps({"post": post.pk, "author": "leo", "text": "Да"})
+            + "\n{не json\n"
+            + json.dumps({"post": post.pk + 1, "author": "leo", "text": "Нет"})
+            + "\n",
+        )
+        output = self.load("comments", path)
+        self.assertIn("Загружено 1 записей", output)
+        self.assertIn("пропущено 2", output)
+        self.assertEqual(
+            list(Comment.objects.values_list("text", flat=True)), ["Да"]
+        )
+
+    def test_refresh_touches_only_imported_users(self):
+        """Проверка, что после загрузки обновляются только затронутые"""
+        leo = User.objects.create_user(username="leo")
+        reader = User.objects.create_user(username="reader")
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=reader, author=leo)
+        UserStats.objects.filter(user=other).update(posts_count=99)
+        self.load(
+            "posts",
+            self.write_jsonl(
+                "posts.jsonl", [{"author": "leo", "text": "Война и мир"}]
+            ),
+        )
+        self.assertEqual(UserStats.objects.get(user=leo).posts_count, 1)
+        self.assertEqual(Timeline.objects.filter(user=reader).count(), 1)
+        self.assertEqual(UserStats.objects.get(user=other).posts_count, 99)
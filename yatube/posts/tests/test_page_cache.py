@@ -0,0 +1,181 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import TwoTierCache
+
+from ..generations import generation_key
+from ..middleware import CACHE_HEADER
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(title="Group", slug="group")
+        cls.other_group = Group.objects.create(title="Other", slug="other")
+        cls.post = Post.objects.create(
+            author=cls.author, text="Test post", group=cls.group
+        )
+        cls.other_post = Post.objects.create(
+            author=User.objects.create_user(username="other"),
+            text="Other post",
+            group=cls.other_group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def cache_state(self, url):
+        return self.guest_client.get(url).get(CACHE_HEADER)
+
+    def test_anonymous_pages_are_cached(self):
+        """Проверка того, что повторный анонимный запрос отдается из
+        кэша, а запрос с другими параметрами кэшируется отдельно"""
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+            reverse("posts:profile", kwargs={"username": self.author}),
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.cache_state(url), "MISS")
+                self.assertEqual(self.cache_state(url), "HIT")
+        self.assertEqual(self.cache_state(urls[0] + "?page=1"), "MISS")
+
+    def test_authorized_pages_are_not_cached(self):
+        """Проверка того, что страницы авторизованного пользователя не
+        кэшируются"""
+        response = self.author_client.get(reverse("posts:index"))
+        self.assertIsNone(response.get(CACHE_HEADER))
+
+    def test_new_post_purges_only_affected_pages(self):
+        """Проверка того, что новый пост сбрасывает только зависящие от
+        него страницы"""
+        index = reverse("posts:index")
+        profile = reverse("posts:profile", kwargs={"username": self.author})
+        other_group = reverse(
+            "posts:group_list", kwargs={"slug": self.other_group.slug}
+        )
+        for url in (index, profile, other_group):
+            self.guest_client.get(url)
+        self.author_client.post(
+            reverse("posts:post_create"),
+            data={"text": "Fresh post", "group": self.group.pk},
+        )
+        self.assertEqual(self.cache_state(index), "MISS")
+        self.assertEqual(self.cache_state(profile), "MISS")
+        self.assertEqual(self.cache_state(other_group), "HIT")
+
+    def test_new_comment_purges_post_page(self):
+        """Проверка того, что новый комментарий сбрасывает страницу поста"""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        self.guest_client.get(url)
+        self.author_client.post(
+            reverse("posts:add_comment", kwargs={"post_id": self.post.pk}),
+            data={"text": "Fresh comment"},
+        )
+        response = self.guest_client.get(url)
+        self.assertEqual(response.get(CACHE_HEADER), "MISS")
+        self.assertContains(response, "Fresh comment")
+
+    def test_stale_fragment_page_is_not_stored(self):
+        """Проверка того, что страница с фрагментом прежней версии не
+        кэшируется и не получает ETag"""
+        index = reverse("posts:index")
+        self.guest_client.get(index)
+        Post.objects.create(author=self.author, text="Fresh post")
+        # Пересчёт фрагмента уже идёт в другом запросе.
+        cache.add(make_template_fragment_key("page_index", [1]) + ":lock", 1)
+        response = self.guest_client.get(index)
+        self.assertNotContains(response, "Fresh post")
+        self.assertFalse(response.has_header("ETag"))
+        self.assertEqual(self.cache_state(index), None)
+
+    def test_new_follower_purges_profile_only(self):
+        """Проверка того, что подписка сбрасывает профиль с числом
+        подписчиков, но не ленту постов"""
+        profile = reverse("posts:profile", kwargs={"username": self.author})
+        index = reverse("posts:index")
+        for url in (profile, index):
+            self.guest_client.get(url)
+        Follow.objects.create(
+            user=User.objects.create_user(username="fan"), author=self.author
+        )
+        response = self.guest_client.get(profile)
+        self.assertEqual(response.get(CACHE_HEADER), "MISS")
+        self.assertContains(response, "Подписчиков: 1")
+        self.assertEqual(self.cache_state(index), "HIT")
+
+
+class SharedCacheTest(TestCase):
+    """Кэш страниц на настроенном бэкенде, общем для процессов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(author=cls.author, text="Test post")
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        options = dict(
+            settings.CACHES["default"]["OPTIONS"],
+            L1_TIMEOUT=0.2,
+            MAX_ENTRIES=20,
+            CULL_EVERY=1,
+        )
+        self.caches = {
+            "default": dict(
+                settings.CACHES["default"],
+                LOCATION=os.path.join(self.tmp_dir, "cache.sqlite3"),
+                OPTIONS=options,
+            )
+        }
+        self.client = Client()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def other_process(self):
+        params = self.caches["default"]
+        return TwoTierCache(params["LOCATION"], params)
+
+    def test_other_process_invalidation_is_seen(self):
+        """Проверка, что сброс поколения другим процессом виден не
+        позже L1_TIMEOUT"""
+        url = reverse("posts:index")
+        with override_settings(CACHES=self.caches):
+            self.assertEqual(self.client.get(url)[CACHE_HEADER], "MISS")
+            self.assertEqual(self.client.get(url)[CACHE_HEADER], "HIT")
+            self.other_process().delete(generation_key("index"))
+            time.sleep(0.3)
+            self.assertEqual(self.client.get(url)[CACHE_HEADER], "MISS")
+
+    def test_pages_survive_culling(self):
+        """Проверка, что вытеснение записей не ломает кэш страниц"""
+        with override_settings(CACHES=self.caches):
+            for number in range(30):
+                cache.set(f"filler{number}", number)
+            url = reverse("posts:post_detail", args=[self.post.pk])
+            response = self.client.get(url)
+            self.assertContains(response, "Test post")
+            self.assertEqual(self.client.get(url)[CACHE_HEADER], "HIT")
+            count = cache._db.execute("SELECT COUNT(*) FROM cache")
+            self.assertLessEqual(count.fetchone()[0], 20)
@@ -0,0 +1,158 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ViewQueriesTest(TestCase):
+    """Число запросов страницы не должно зависеть от числа объектов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(title="Test group", slug="test")
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Post"
+        )
+
+    def add_posts(self, author=None, group=None):
+        """Добавляет три поста, по умолчанию от разных авторов и в
+        разных группах."""
+        for i in range(3):
+            number = Post.objects.count()
+            post_author = author or User.objects.create_user(
+                username=f"author_{number}"
+            )
+            Follow.objects.get_or_create(user=self.reader, author=post_author)
+            post_group = group or Group.objects.create(
+                title=f"Group {number}", slug=f"group_{number}"
+            )
+            Post.objects.create(
+                author=post_author, group=post_group, text="Post"
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assert_queries_stay_flat(self, url, queries, grow):
+        with self.assertNumQueries(queries):
+            self.client.get(url)
+        grow()
+        cache.clear()
+        with self.assertNumQueries(queries):
+            self.client.get(url)
+
+    def test_feed_queries(self):
+        """Проверка числа запросов лент с постами разных авторов и групп"""
+        cases = (
+            (reverse("posts:index"), 4, self.add_posts),
+            # С холодным кэшем лента читает ещё и список подписок.
+            (reverse("posts:follow_index"), 5, self.add_posts),
+            (
+                reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+                6,
+                lambda: self.add_posts(group=self.group),
+            ),
+            (
+                reverse("posts:profile", kwargs={"username": self.author}),
+                7,
+                lambda: self.add_posts(author=self.author),
+            ),
+        )
+        for url, queries, grow in cases:
+            with self.subTest(url=url):
+                self.assert_queries_stay_flat(url, queries, grow)
+
+    def test_post_detail_queries(self):
+        """Проверка числа запросов страницы поста с комментариями"""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+
+        def add_comments():
+            for i in range(3):
+                author = User.objects.create_user(username=f"commenter_{i}")
+                Comment.objects.create(
+                    post=self.post, author=author, text="Comment"
+                )
+
+        self.assert_queries_stay_flat(url, 5, add_comments)
+
+    def test_query_plans_use_indexes(self):
+        """Проверка, что запросы страниц идут по индексам без сортировки
+        во временном дереве"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        out = StringIO()
+        call_command("explain_queries", "--check", stdout=out)
+        self.assertIn("profile: OK", out.getvalue())
+        self.assertIn("post_author_date_idx", out.getvalue())
+
+
+class AdminQueriesTest(TestCase):
+    """Число запросов списков админки не зависит от числа строк."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="admin"
+        )
+        cls.follower = User.objects.create_user(username="follower")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def add_rows(self):
+        for i in range(5):
+            author = User.objects.create_user(
+                username=f"author_{User.objects.count()}"
+            )
+            group = Group.objects.create(
+                title=f"Group {author.pk}", slug=f"group_{author.pk}"
+            )
+            post = Post.objects.create(author=author, group=group, text="Post")
+            Comment.objects.create(post=post, author=author, text="Comment")
+            Follow.objects.create(user=self.follower, author=author)
+
+    def test_changelist_queries(self):
+        """Проверка числа запросов страниц списков в админке"""
+        cases = (
+            ("admin:posts_post_changelist", 5),
+            ("admin:posts_comment_changelist", 5),
+            ("admin:posts_follow_changelist", 3),
+        )
+        self.add_rows()
+        for name, queries in cases:
+            with self.subTest(name=name):
+                url = reverse(name)
+                self.client.get(url)
+                with self.assertNumQueries(queries):
+                    self.client.get(url)
+                self.add_rows()
+                cache.clear()
+                self.client.get(url)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_filtered_count_follows_changes(self):
+        """Проверка, что число отфильтрованных строк обновляется"""
+        self.add_rows()
+        url = reverse("admin:posts_follow_changelist")
+        params = {"q": self.follower.username}
+        response = self.client.get(url, params)
+        self.assertEqual(response.context["cl"].result_count, 5)
+        Follow.objects.filter(user=self.follower).first().delete()
+        response = self.client.get(url, params)
+        self.assertEqual(response.context["cl"].result_count, 4)
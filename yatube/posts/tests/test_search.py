@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .. import search
+from ..admin import PostAdmin
+from ..models import Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.once = Post.objects.create(
+            author=cls.user, text="Кошка спит на окне, рядом собака"
+        )
+        cls.twice = Post.objects.create(
+            author=cls.user, text="Кошка и кошки: про кошку"
+        )
+        cls.other = Post.objects.create(
+            author=cls.user, text="Собака гуляет во дворе"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, query):
+        return [post.pk for post in search.search_posts(query)]
+
+    def test_results_are_ranked(self):
+        """Проверка порядка результатов по релевантности"""
+        self.assertEqual(self.found("кошк"), [self.twice.pk, self.once.pk])
+
+    def test_all_words_must_match(self):
+        """Проверка, что найдены посты со всеми словами запроса"""
+        self.assertEqual(self.found("КОШКА собака"), [self.once.pk])
+
+    def test_fts_syntax_is_escaped(self):
+        """Проверка, что операторы FTS5 в запросе не ломают поиск"""
+        self.assertEqual(self.found('собака" OR NEAR(*'), [])
+        self.assertEqual(self.found("!!!"), [])
+
+    def test_index_follows_changes(self):
+        """Проверка, что индекс обновляется при правке и удалении"""
+        self.other.text = "Кошка гуляет во дворе"
+        self.other.save()
+        self.assertIn(self.other.pk, self.found("кошка"))
+        self.assertNotIn(self.other.pk, self.found("собака"))
+        Post.objects.filter(pk=self.other.pk).update(text="Тишина")
+        self.assertEqual(self.found("тишина"), [self.other.pk])
+        Post.objects.filter(pk=self.other.pk).delete()
+        self.assertEqual(self.found("тишина"), [])
+
+    def test_search_page(self):
+        """Проверка страницы поиска и ссылок паджинатора"""
+        response = self.client.get(reverse("posts:search"), {"q": "собака"})
+        self.assertTemplateUsed(response, "posts/search.html")
+        self.assertEqual(
+            [post.pk for post in response.context["page_obj"]],
+            [self.other.pk, self.once.pk],
+        )
+        self.assertEqual(
+            response.context["page_query"], urlencode({"q": "собака"}) + "&"
+        )
+        response = self.client.get(reverse("posts:search"))
+        self.assertEqual(len(response.context["page_obj"]), 0)
+
+    def test_admin_search_uses_index(self):
+        """Проверка поиска в админке через индекс FTS5"""
+        admin = PostAdmin(Post, AdminSite())
+        request = RequestFactory().get("/")
+        queryset, use_distinct = admin.get_search_results(
+            request, Post.objects.all(), "собака"
+        )
+        self.assertFalse(use_distinct)
+        self.assertIn(search.TABLE, str(queryset.query))
+        self.assertCountEqual(
+            queryset.values_list("pk", flat=True),
+            [self.once.pk, self.other.pk],
+        )
+
+    def test_rebuild_command(self):
+        """Проверка пересборки индекса командой"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.TABLE} ({search.TABLE}) "
+                "VALUES ('delete-all')"
+            )
+        self.assertEqual(self.found("гуляет"), [])
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertEqual(self.found("гуляет"), [self.other.pk])
+        self.assertIn("3 постов", out.getvalue())
+
+    def test_benchmark_command(self):
+        """Проверка команды сравнения поиска с icontains"""
+        out = StringIO()
+        call_command("benchmark_search", "собака", "--repeat=1", stdout=out)
+        self.assertIn("fts5", out.getvalue())
+        self.assertIn("icontains", out.getvalue())
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from .. import images
+from ..models import Post
+from .test_thumbnails import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def tearDown(self):
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, "posts"), ignore_errors=True
+        )
+
+    def create_post(self, filename="small.gif"):
+        post = Post(author=self.user, text="Post")
+        post.image.save(filename, ContentFile(SMALL_GIF))
+        return post
+
+    def files(self):
+        return [
+            os.path.relpath(os.path.join(directory, filename), TEMP_MEDIA_ROOT)
+            for directory, _, filenames in os.walk(
+                os.path.join(TEMP_MEDIA_ROOT, "posts")
+            )
+            for filename in filenames
+        ]
+
+    def test_identical_images_share_one_file(self):
+        """Проверка, что одинаковые картинки хранятся одним файлом"""
+        first = self.create_post("first.gif")
+        second = self.create_post("second.gif")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r"^posts/[0-9a-f]{2}/[0-9a-f]{64}")
+        self.assertEqual(self.files(), [first.image.name])
+
+    def test_file_is_released_with_last_reference(self):
+        """Проверка удаления файла только после последней ссылки"""
+        first = self.create_post()
+        second = self.create_post()
+        name = first.image.name
+        with mock.patch.object(images, "RELEASE_GRACE", 0):
+            first.delete()
+            self.assertFalse(images.release(name))
+            second.delete()
+            self.assertTrue(images.release(name))
+        self.assertEqual(self.files(), [])
+
+    @override_settings(POST_IMAGE_DEFERRED_RELEASE=False)
+    def test_recent_file_is_not_released(self):
+        """Проверка, что только что загруженный файл не удаляется"""
+        post = self.create_post()
+        name = post.image.name
+        post.delete()
+        self.assertFalse(images.release(name))
+        self.assertEqual(self.files(), [name])
+
+    def test_racing_identical_uploads_share_one_file(self):
+        """Проверка одновременной загрузки одинаковых картинок"""
+        storage = Post._meta.get_field("image").storage
+        # Оба запроса не нашли файл и пишут его одновременно; дальше
+        # хранилище видит файл как есть.
+        answers = iter([False, False])
+        exists = storage.exists
+        with mock.patch.object(
+            storage, "exists", lambda name: next(answers, exists(name))
+        ):
+            first = self.create_post("first.gif")
+            second = self.create_post("second.gif")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.files(), [first.image.name])
+
+    def test_recent_file_is_released_after_grace(self):
+        """Проверка отложенного удаления только что загруженного файла"""
+        post = self.create_post()
+        name = post.image.name
+        post.delete()
+        with mock.patch.object(images.threading, "Timer") as timer:
+            self.assertFalse(images.release(name))
+        delay, function, args = timer.call_args[0]
+        self.assertGreater(delay, images.RELEASE_GRACE - 1)
+        self.assertEqual(self.files(), [name])
+        with mock.patch.object(images, "RELEASE_GRACE", 0):
+            with mock.patch.object(images.connection, "close"):
+                function(*args)
+        self.assertEqual(self.files(), [])
+
+    def test_dedupe_command(self):
+        """Проверка переноса старых картинок в хранилище по хэшу"""
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, "posts"))
+        for filename in ("a.gif", "b.gif"):
+            path = os.path.join(TEMP_MEDIA_ROOT, "posts", filename)
+            with open(path, "wb") as file:
+                file.write(SMALL_GIF)
+            Post.objects.create(
+                author=self.user, text=filename, image=f"posts/{filename}"
+            )
+        out = StringIO()
+        call_command("dedupe_media", "--dry-run", stdout=out)
+        self.assertIn("перенесено 1, удалено копий 1", out.getvalue())
+        self.assertEqual(len(self.files()), 2)
+
+        call_command("dedupe_media", stdout=StringIO())
+        names = set(Post.objects.values_list("image", flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(self.files(), list(names))
@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..generations import get_generation, invalidate_post
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text="Test post",
+            image=SimpleUploadedFile(
+                name="small.gif", content=SMALL_GIF, content_type="image/gif"
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("posts:post_detail", args=[self.post.pk])
+
+    def test_thumbnail_is_rendered_when_ready(self):
+        """Проверка, что готовая миниатюра попадает в страницу"""
+        response = self.client.get(self.url)
+        self.assertTrue(thumbnails.is_ready(self.post.image.name))
+        self.assertContains(response, settings.MEDIA_URL + "cache/")
+
+    @override_settings(POST_THUMBNAIL_RECORD_TIMEOUT=0.1)
+    def test_ready_record_expires(self):
+        """Проверка, что сведения о миниатюрах не хранятся вечно"""
+        name = self.post.image.name
+        thumbnails.mark_ready(name, thumbnails.generate(name))
+        self.assertTrue(thumbnails.is_ready(name))
+        time.sleep(0.2)
+        self.assertFalse(thumbnails.is_ready(name))
+
+    @override_settings(POST_THUMBNAIL_WORKERS=2)
+    def test_placeholder_until_background_job_finishes(self):
+        """Проверка заглушки, пока миниатюра готовится в фоне"""
+        with mock.patch.object(thumbnails, "_executor") as executor:
+            response = self.client.get(self.url)
+        executor.submit.assert_called_once_with(
+            thumbnails._generate_in_background,
+            self.post.image.name,
+            self.post.pk,
+        )
+        self.assertContains(response, "data:image/svg+xml")
+        self.assertNotContains(response, settings.MEDIA_URL + "cache/")
+
+        generation = get_generation("post", self.post.pk)
+        with mock.patch.object(thumbnails.connection, "close"):
+            thumbnails._generate_in_background(
+                self.post.image.name, self.post.pk
+            )
+        self.assertNotEqual(get_generation("post", self.post.pk), generation)
+        response = self.client.get(self.url)
+        self.assertContains(response, settings.MEDIA_URL + "cache/")
+
+    def test_feed_page_fetches_thumbnails_at_once(self):
+        """Проверка, что лента запрашивает миниатюры страницы разом"""
+        # Одинаковые картинки хранятся одним файлом, поэтому содержимое
+        # у каждой своё.
+        for number in range(3):
+            Post.objects.create(
+                author=self.user,
+                text=f"Post {number}",
+                image=SimpleUploadedFile(
+                    name=f"feed{number}.gif",
+                    content=SMALL_GIF + bytes([number]),
+                    content_type="image/gif",
+                ),
+            )
+        self.client.get(reverse("posts:index"))
+        invalidate_post(self.post)
+        with mock.patch.object(
+            thumbnails, "get_records", wraps=thumbnails.get_records
+        ) as get_records:
+            response = self.client.get(reverse("posts:index"))
+        get_records.assert_called_once()
+        self.assertEqual(len(get_records.call_args[0][0]), 4)
+        self.assertContains(response, "srcset=", 4)
+
+    def test_regenerate_command(self):
+        """Проверка команды подготовки миниатюр"""
+        Post.objects.create(
+            author=self.user, text="Missing", image="posts/missing.gif"
+        )
+        out = StringIO()
+        call_command("regenerate_thumbnails", "--workers=1", stdout=out)
+        self.assertTrue(thumbnails.is_ready(self.post.image.name))
+        self.assertFalse(thumbnails.is_ready("posts/missing.gif"))
+        self.assertIn("Миниатюры готовы для 1 картинок", out.getvalue())
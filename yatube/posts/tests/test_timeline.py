@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from ..follow_feed import get_follow_feed
+from ..models import Follow, Post, Timeline
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.user = User.objects.create_user(username="user")
+        cls.old_post = Post.objects.create(author=cls.author, text="Old")
+
+    def entries(self):
+        return set(
+            Timeline.objects.filter(user=self.user).values_list(
+                "post_id", flat=True
+            )
+        )
+
+    def test_follow_backfills_and_new_post_fans_out(self):
+        """Проверка заполнения ленты при подписке и при публикации"""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.entries(), {self.old_post.pk})
+        new_post = Post.objects.create(author=self.author, text="New")
+        self.assertEqual(self.entries(), {self.old_post.pk, new_post.pk})
+
+    def test_unfollow_trims_timeline(self):
+        """Проверка очистки ленты от постов автора при отписке"""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertEqual(self.entries(), set())
+
+    def test_rebuild_command_restores_timeline(self):
+        """Проверка пересборки лент командой rebuild_timelines"""
+        Follow.objects.create(user=self.user, author=self.author)
+        Timeline.objects.all().delete()
+        call_command("rebuild_timelines", stdout=StringIO())
+        self.assertEqual(self.entries(), {self.old_post.pk})
+
+    @override_settings(TIMELINE_REBUILD_USERS=1)
+    def test_rebuild_replaces_feeds_in_batches(self):
+        """Проверка пересборки лент пачками пользователей"""
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        stale = Post.objects.create(author=other, text="Stale")
+        Timeline.objects.create(
+            user=self.user, post=stale, pub_date=stale.pub_date
+        )
+        with self.assertNumQueries(5 * 3 + 1):
+            call_command("rebuild_timelines", stdout=StringIO())
+        self.assertEqual(self.entries(), {self.old_post.pk})
+        self.assertEqual(
+            Timeline.objects.filter(user=other).count(),
+            Post.objects.filter(author=self.author).count(),
+        )
+
+    def test_equal_dates_keep_stable_order(self):
+        """Проверка порядка постов с одинаковой датой"""
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f"Post {number}")
+            for number in range(3)
+        ]
+        Timeline.objects.update(pub_date=self.old_post.pub_date)
+        self.assertEqual(
+            list(get_follow_feed(self.user, "timeline")),
+            [*reversed(posts), self.old_post],
+        )
+
+    def test_feed_reads_timeline_index_range(self):
+        """Проверка, что лента идёт по индексу без сортировки"""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text="New")
+        feed = get_follow_feed(self.user, "timeline")
+        self.assertEqual(list(feed), [new_post, self.old_post])
+        sql, params = feed.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("timeline_user_date_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
@@ -10,6 +10,7 @@ from django.test import Client, TestCase
 from django.test.utils import override_settings
 from django.urls import reverse
 
+from ..counters import feed_count_key
 from ..models import Follow, Group, Post
 
 User = get_user_model()
@@ -218,6 +219,7 @@ class PostViewPaginatorTest(TestCase):
         Post.objects.bulk_create(objs)
 
     def setUp(self):
+        cache.clear()
         self.author_client = Client()
         self.author_client.force_login(self.user)
 
@@ -262,6 +264,100 @@ class PostViewPaginatorTest(TestCase):
         self.assertEqual(len(response.context["page_obj"]), 5)
 
 
+@override_settings(PAGINATOR_WINDOW=1)
+class PostViewWindowedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        objs = (Post(author=cls.user, text="Test post") for _ in range(95))
+        Post.objects.bulk_create(objs)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_paginator_renders_page_window(self):
+        """Проверка того, что паджинатор показывает только окно страниц"""
+        response = self.client.get(reverse("posts:index") + "?page=5")
+        paginator = response.context["page_obj"].paginator
+        self.assertEqual(
+            paginator.page_window(5), [1, None, 4, 5, 6, None, 10]
+        )
+        self.assertContains(response, "?page=6")
+        self.assertNotContains(response, "?page=3")
+
+    def test_paginator_count_is_cached(self):
+        """Проверка того, что число постов берётся из кэша и сдвигается
+        при создании и удалении поста"""
+        self.client.get(reverse("posts:index"))
+        post = Post.objects.create(author=self.user, text="New post")
+        response = self.client.get(reverse("posts:index"))
+        self.assertEqual(response.context["page_obj"].paginator.count, 96)
+        post.delete()
+        self.assertEqual(cache.get(feed_count_key("all")), 95)
+
+
+@override_settings(POSTS_PAGINATION="cursor")
+class PostViewCursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        objs = (Post(author=cls.user, text=f"Post {i}") for i in range(15))
+        Post.objects.bulk_create(objs)
+        # Одинаковая дата у всех постов: порядок держится только на id
+        Post.objects.update(pub_date=Post.objects.first().pub_date)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def test_cursor_pages_cover_all_posts_once(self):
+        """Проверка того, что курсорные страницы не теряют и не
+        повторяют посты"""
+        first = self.author_client.get(reverse("posts:index")).context[
+            "page_obj"
+        ]
+        self.assertEqual(len(first), 10)
+        self.assertFalse(first.has_previous())
+        response = self.author_client.get(
+            reverse("posts:index") + f"?after={first.next_cursor}"
+        )
+        # Фрагмент второй страницы кэшируется под своим ключом.
+        self.assertContains(response, "Post 0")
+        second = response.context["page_obj"]
+        self.assertEqual(len(second), 5)
+        self.assertFalse(second.has_next())
+        ids = [post.pk for post in list(first) + list(second)]
+        expected = Post.objects.order_by("-pk").values_list("pk", flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_cursor_before_returns_previous_page(self):
+        """Проверка перехода на предыдущую страницу по курсору before"""
+        first = self.author_client.get(reverse("posts:index")).context[
+            "page_obj"
+        ]
+        second = self.author_client.get(
+            reverse("posts:index") + f"?after={first.next_cursor}"
+        ).context["page_obj"]
+        back = self.author_client.get(
+            reverse("posts:index") + f"?before={second.previous_cursor}"
+        ).context["page_obj"]
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_cursor_invalid_token_returns_first_page(self):
+        """Проверка того, что битый курсор открывает первую страницу"""
+        response = self.author_client.get(
+            reverse("posts:profile", kwargs={"username": self.user})
+            + "?after=broken"
+        )
+        self.assertEqual(len(response.context["page_obj"]), 10)
+        self.assertFalse(response.context["page_obj"].has_previous())
+
+
 class FollowViewTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -0,0 +1,262 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import toint
+
+from . import generations
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Прозрачная заглушка: под ней видна размытая копия картинки (LQIP).
+PLACEHOLDER_URL = (
+    "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' "
+    "width='{width}' height='{height}'/%3E"
+)
+
+# Время, в течение которого картинку не ставят в очередь повторно.
+PENDING_TIMEOUT = 60
+
+_executor = None
+
+
+class Thumbnail:
+    """Готовая миниатюра: то, что нужно шаблону для тега img."""
+
+    def __init__(self, url, width, height, srcset=""):
+        self.url = url
+        self.width = width
+        self.height = height
+        self.srcset = srcset
+
+
+def placeholder(geometry, size=None):
+    """Заглушка того же размера на месте миниатюры, которая готовится.
+
+    size — размер миниатюры из display_size; без него заглушка
+    занимает всю геометрию.
+    """
+    if size is None:
+        size = (int(side) for side in geometry.split("x"))
+    width, height = size
+    return Thumbnail(
+        PLACEHOLDER_URL.format(width=width, height=height), width, height
+    )
+
+
+def display_size(post, geometry, options):
+    """Размер миниатюры картинки поста по сохранённым размерам картинки.
+
+    Считается так же, как его считает sorl-thumbnail, но без обращения
+    к файлу и к сведениям о миниатюрах; None — если размеры картинки
+    ещё не заполнены (см. команду backfill_image_sizes).
+    """
+    if not post.image_width or not post.image_height:
+        return None
+    box_width, box_height = (int(size) for size in geometry.split("x"))
+    crop = options.get("crop")
+    factors = (box_width / post.image_width, box_height / post.image_height)
+    factor = max(factors) if crop else min(factors)
+    upscale = options.get("upscale", thumbnail_settings.THUMBNAIL_UPSCALE)
+    width, height = post.image_width, post.image_height
+    if factor < 1 or upscale:
+        width, height = toint(width * factor), toint(height * factor)
+    if crop and crop != "noop":
+        width, height = min(width, box_width), min(height, box_height)
+    return width, height
+
+
+def variants(geometry):
+    """Уменьшенные копии геометрии для srcset, от меньшей к большей.
+
+    Ширины берутся из settings.POST_THUMBNAIL_WIDTHS, высота — в той
+    же пропорции.
+    """
+    width, height = (int(size) for size in geometry.split("x"))
+    return [
+        f"{variant}x{round(height * variant / width)}"
+        for variant in sorted(settings.POST_THUMBNAIL_WIDTHS)
+        if variant < width
+    ]
+
+
+def _key(name, state):
+    digest = hashlib.md5(name.encode()).hexdigest()
+    return f"posts:thumbnails:{state}:{digest}"
+
+
+def get_records(names):
+    """Сведения о готовых миниатюрах картинок names одним запросом.
+
+    Возвращает словарь {имя картинки: {геометрия: (имя, ширина,
+    высота)}}; картинок, миниатюры которых не готовы, в нём нет.
+    Вместе со сведениями читается их поколение: сведения прежнего
+    поколения (см. forget_all) считаются отсутствующими.
+    """
+    keys = {_key(name, "ready"): name for name in names}
+    version_key = generations.generation_key("thumbnails")
+    values = cache.get_many([version_key, *keys])
+    version = values.pop(version_key, None)
+    return {
+        keys[key]: record
+        for key, (record_version, record) in values.items()
+        if record_version == version
+    }
+
+
+def is_ready(name):
+    """Готовы ли все миниатюры из settings.POST_THUMBNAILS для name."""
+    return name in get_records([name])
+
+
+def generate(name):
+    """Готовит миниатюры картинки name во всех геометриях.
+
+    Возвращает сведения о миниатюрах для mark_ready или None, если
+    исходного файла нет. Вызывается и из других процессов, поэтому
+    принимает имя файла, а не объект.
+    """
+    if not default_storage.exists(name):
+        return None
+    record = {}
+    for geometry, options in settings.POST_THUMBNAILS.items():
+        for variant in variants(geometry) + [geometry]:
+            image = get_thumbnail(name, variant, **options)
+            record[variant] = (image.name, image.width, image.height)
+    return record
+
+
+def mark_ready(name, record):
+    cache.set(
+        _key(name, "ready"),
+        (generations.get_generation("thumbnails"), record),
+        settings.POST_THUMBNAIL_RECORD_TIMEOUT,
+    )
+
+
+def forget(name):
+    """Забывает сведения о миниатюрах удалённой картинки."""
+    cache.delete_many([_key(name, "ready"), _key(name, "pending")])
+
+
+def forget_all():
+    """Забывает сведения о миниатюрах всех картинок.
+
+    Нужно, когда удалены файлы миниатюр, картинки которых неизвестны.
+    """
+    generations.invalidate(generations.generation_key("thumbnails"))
+
+
+def _generate_in_background(name, post_id):
+    try:
+        record = generate(name)
+        if record is None:
+            return
+        mark_ready(name, record)
+        # Пока миниатюры готовились, ленты могли закэшировать заглушку.
+        post = Post.objects.filter(pk=post_id).first()
+        if post is not None:
+            generations.invalidate_post(post)
+    except Exception:
+        logger.exception("Не удалось подготовить миниатюры %s", name)
+    finally:
+        connection.close()
+
+
+def schedule(name, post_id):
+    """Ставит подготовку миниатюр картинки поста в фоновый пул.
+
+    При settings.POST_THUMBNAIL_WORKERS == 0 миниатюры готовятся сразу.
+    Картинка, уже стоящая в очереди, повторно не ставится.
+    """
+    global _executor
+    if is_ready(name):
+        return
+    if not cache.add(_key(name, "pending"), True, PENDING_TIMEOUT):
+        return
+    if not settings.POST_THUMBNAIL_WORKERS:
+        try:
+            record = generate(name)
+            if record is not None:
+                mark_ready(name, record)
+        except Exception:
+            logger.exception("Не удалось подготовить миниатюры %s", name)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            settings.POST_THUMBNAIL_WORKERS, "thumbnails"
+        )
+    _executor.submit(_generate_in_background, name, post_id)
+
+
+def thumbnail(post, geometry, records=None):
+    """Миниатюра картинки поста или заглушка, пока она готовится.
+
+    records — результат get_records для страницы постов; без него
+    сведения о миниатюре запрашиваются из кэша отдельно.
+    """
+    if not post.image:
+        return None
+    name = post.image.name
+    options = settings.POST_THUMBNAILS[geometry]
+    if records is None:
+        records = get_records([name])
+    record = records.get(name)
+    if record is None:
+        schedule(name, post.pk)
+        record = get_records([name]).get(name)
+        if record is None:
+            return placeholder(
+                geometry, display_size(post, geometry, options)
+            )
+    if geometry not in record:
+        # Геометрию добавили, а миниатюры ещё не пересобраны.
+        try:
+            return get_thumbnail(post.image, geometry, **options)
+        except Exception:
+            logger.exception("Не удалось получить миниатюру %s", name)
+            return None
+    # Размеры берутся из полей поста; сведения о миниатюрах нужны для
+    # них только постам, размеры картинок которых ещё не заполнены.
+    sizes = {}
+    for variant in variants(geometry) + [geometry]:
+        if variant in record:
+            thumbnail_name, width, height = record[variant]
+            sizes[variant] = (
+                thumbnail_name,
+                display_size(post, variant, options) or (width, height),
+            )
+    srcset = ", ".join(
+        f"{default.storage.url(thumbnail_name)} {width}w"
+        for thumbnail_name, (width, _) in sizes.values()
+    )
+    thumbnail_name, (width, height) = sizes[geometry]
+    return Thumbnail(
+        default.storage.url(thumbnail_name), width, height, srcset
+    )
+
+
+class PageThumbnails:
+    """Миниатюры постов страницы, запрашиваемые из кэша разом.
+
+    Запрос выполняется при первом обращении, то есть только когда
+    фрагмент ленты действительно рендерится.
+    """
+
+    def __init__(self, posts):
+        self.posts = posts
+        self._records = None
+
+    def get(self, post, geometry):
+        if self._records is None:
+            self._records = get_records(
+                {item.image.name for item in self.posts if item.image}
+            )
+        return thumbnail(post, geometry, self._records)
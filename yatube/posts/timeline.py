@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Follow, Post, Timeline, User
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(author=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    Timeline.objects.bulk_create(
+        (
+            Timeline(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту подписчика все посты автора."""
+    posts = Post.objects.filter(author=follow.author_id).values_list(
+        "pk", "pub_date"
+    )
+    Timeline.objects.bulk_create(
+        (
+            Timeline(user_id=follow.user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts.iterator()
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim(follow):
+    """Убирает из ленты подписчика посты автора, от которого он
+    отписался."""
+    Timeline.objects.filter(
+        user=follow.user_id, post__author=follow.author_id
+    ).delete()
+
+
+def _fill_sql():
+    # INSERT ... SELECT по подпискам; условие на пользователей
+    # дописывает вызывающий.
+    quote = connection.ops.quote_name
+    return (
+        f"INSERT INTO {quote(Timeline._meta.db_table)} "
+        f"({quote('user_id')}, {quote('post_id')}, {quote('pub_date')}) "
+        f"SELECT f.{quote('user_id')}, p.{quote('id')}, "
+        f"p.{quote('pub_date')} "
+        f"FROM {quote(Follow._meta.db_table)} f "
+        f"INNER JOIN {quote(Post._meta.db_table)} p "
+        f"ON p.{quote('author_id')} = f.{quote('author_id')}"
+    )
+
+
+def rebuild(users=None):
+    """Пересобирает ленты с нуля по таблице подписок.
+
+    Ленты пересобираются пачками по TIMELINE_REBUILD_USERS
+    пользователей, каждая пачка — одним INSERT ... SELECT в своей
+    транзакции: читатели видят либо прежнюю ленту, либо новую, но не
+    пустую, а сбой не оставляет ленты пустыми.
+    """
+    if users is None:
+        users = User.objects.all()
+    user_ids = users.order_by("pk").values_list("pk", flat=True)
+    sql = _fill_sql()
+    last_pk = 0
+    while True:
+        batch = list(
+            user_ids.filter(pk__gt=last_pk)[: settings.TIMELINE_REBUILD_USERS]
+        )
+        if not batch:
+            return
+        last_pk = batch[-1]
+        placeholders = ", ".join(["%s"] * len(batch))
+        with transaction.atomic(), connection.cursor() as cursor:
+            Timeline.objects.filter(user__in=batch).delete()
+            cursor.execute(
+                f"{sql} WHERE f.{connection.ops.quote_name('user_id')} "
+                f"IN ({placeholders})",
+                batch,
+            )
@@ -1,13 +1,60 @@
 from django.urls import path
 
-from . import views
+from . import conditional, feeds, views
 
 app_name = "posts"
 
 urlpatterns = [
+    path(
+        "feed/",
+        feeds.cached_feed(feeds.LatestPostsFeed(), conditional.index_scopes),
+        name="feed",
+    ),
+    path(
+        "feed/atom/",
+        feeds.cached_feed(
+            feeds.LatestPostsAtomFeed(), conditional.index_scopes
+        ),
+        name="feed_atom",
+    ),
+    path(
+        "group/<slug:slug>/feed/",
+        feeds.cached_feed(feeds.GroupPostsFeed(), conditional.group_scopes),
+        name="group_feed",
+    ),
+    path(
+        "group/<slug:slug>/feed/atom/",
+        feeds.cached_feed(
+            feeds.GroupPostsAtomFeed(), conditional.group_scopes
+        ),
+        name="group_feed_atom",
+    ),
+    path(
+        "profile/<str:username>/feed/",
+        feeds.cached_feed(feeds.AuthorPostsFeed(), conditional.author_scopes),
+        name="profile_feed",
+    ),
+    path(
+        "profile/<str:username>/feed/atom/",
+        feeds.cached_feed(
+            feeds.AuthorPostsAtomFeed(), conditional.author_scopes
+        ),
+        name="profile_feed_atom",
+    ),
     path("", views.index, name="index"),
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
+    path(
+        "group/<slug:slug>/export/",
+        views.group_export,
+        name="group_export",
+    ),
     path("profile/<str:username>/", views.profile, name="profile"),
+    path(
+        "profile/<str:username>/export/",
+        views.profile_export,
+        name="profile_export",
+    ),
+    path("search/", views.search, name="search"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
     path("create/", views.post_create, name="post_create"),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
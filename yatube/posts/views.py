@@ -1,50 +1,69 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 from django.views.decorators.http import require_http_methods
 
+from . import conditional, export
+from .counters import feed_count_key, follow_count_key, get_stats
+from .follow_feed import get_follow_feed
 from .forms import CommentForm, PostForm
+from .generations import (
+    combined_generation,
+    follow_scopes,
+    get_generation,
+)
 from .models import Comment, Follow, Group, Post, User
+from .paginators import WindowedPaginator, paginate
+from .search import search_posts
+from .thumbnails import PageThumbnails
 
 
 @require_http_methods(["GET"])
+@conditional.conditional_page(conditional.index_scopes)
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related("author", "group")
+    page_obj = paginate(request, posts, feed_count_key("all"))
     context = {
         "page_obj": page_obj,
+        "page_thumbnails": PageThumbnails(page_obj),
+        "cache_version": get_generation("index"),
     }
     return render(request, "posts/index.html", context)
 
 
 @require_http_methods(["GET"])
+@conditional.conditional_page(conditional.group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.select_related("author")
+    page_obj = paginate(request, posts, feed_count_key("group", group.pk))
     context = {
         "group": group,
         "page_obj": page_obj,
+        "page_thumbnails": PageThumbnails(page_obj),
+        "cache_version": get_generation("group", group.pk),
     }
     return render(request, "posts/group_list.html", context)
 
 
 @require_http_methods(["GET"])
+@conditional.conditional_page(conditional.profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    posts_count = page_obj.paginator.count
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    posts = Post.objects.filter(author=author).select_related("group")
+    page_obj = paginate(request, posts, feed_count_key("author", author.pk))
+    stats = get_stats(author)
     context = {
         "author": author,
         "page_obj": page_obj,
-        "posts_count": posts_count,
+        "page_thumbnails": PageThumbnails(page_obj),
+        "posts_count": stats.posts_count,
+        "stats": stats,
+        "cache_version": get_generation("author", author.pk),
     }
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -54,17 +73,67 @@ def profile(request, username):
     return render(request, "posts/profile.html", context)
 
 
+def _export(request, posts, name):
+    fmt = request.GET.get("format", "json")
+    if fmt not in export.FORMATS:
+        raise Http404("Неизвестный формат выгрузки")
+    response = StreamingHttpResponse(
+        export.stream(posts, fmt, request.build_absolute_uri),
+        content_type=f"{export.FORMATS[fmt]}; charset=utf-8",
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{name}-posts.{fmt}"'
+    )
+    return response
+
+
+@login_required
+@require_http_methods(["GET"])
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    return _export(request, author.posts.all(), author.username)
+
+
+@login_required
+@require_http_methods(["GET"])
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _export(request, group.posts.all(), group.slug)
+
+
+@require_http_methods(["GET"])
+def search(request):
+    query = request.GET.get("q", "").strip()
+    posts = Post.objects.select_related("author", "group")
+    posts = search_posts(query, posts)
+    # Результаты упорядочены по релевантности, поэтому курсор по дате
+    # к ним не подходит: страницы всегда нумерованные.
+    paginator = WindowedPaginator(posts, settings.POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    context = {
+        "query": query,
+        "page_obj": page_obj,
+        "page_query": urlencode({"q": query}) + "&",
+        "page_thumbnails": PageThumbnails(page_obj),
+    }
+    return render(request, "posts/search.html", context)
+
+
 @require_http_methods(["GET", "POST"])
+@conditional.conditional_page(conditional.post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    user_posts_count = Post.objects.filter(author=post.author).count()
-    comments = Comment.objects.filter(post=post)
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"), pk=post_id
+    )
+    user_posts_count = get_stats(post.author).posts_count
+    comments = Comment.objects.filter(post=post).select_related("author")
     form = CommentForm()
     context = {
         "post": post,
         "form": form,
         "comments": comments,
         "user_posts_count": user_posts_count,
+        "cache_version": get_generation("post", post.pk),
     }
     return render(request, "posts/post_detail.html", context)
 
@@ -127,13 +196,16 @@ def add_comment(request, post_id):
 
 @login_required
 @require_http_methods(["GET"])
+@conditional.conditional_page(conditional.follow_scopes)
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = get_follow_feed(request.user)
+    page_obj = paginate(
+        request, posts, follow_count_key(request.user.pk)
+    )
     context = {
         "page_obj": page_obj,
+        "page_thumbnails": PageThumbnails(page_obj),
+        "cache_version": combined_generation(follow_scopes(request.user.pk)),
     }
     return render(request, "posts/follow.html", context)
 
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     "core.apps.CoreConfig",
     "users.apps.UsersConfig",
     "posts.apps.PostsConfig",
+    "api.apps.ApiConfig",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "posts.middleware.AnonymousPageCacheMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -146,8 +148,107 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
+# Тесты запускаются с настройками yatube.test_settings.
+TEST_RUNNER = "core.testing.TestRunner"
+
+# Общий для всех процессов кэш: LRU в памяти процесса (L1) поверх
+# файла SQLite (L2). EVICTION — порядок вытеснения из L2: "lru" или
+# "fifo"; L1_TIMEOUT ограничивает, сколько секунд воркер может не
+# видеть изменений, сделанных другим процессом.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "core.cache.TwoTierCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache.sqlite3"),
+        "OPTIONS": {
+            "MAX_ENTRIES": 100000,
+            "CULL_FREQUENCY": 10,
+            "EVICTION": "lru",
+            "L1_MAX_ENTRIES": 1000,
+            "L1_TIMEOUT": 2,
+        },
     }
 }
+
+# Режим паджинации лент: "page" (номера страниц) или "cursor"
+# (курсор по (pub_date, id), без OFFSET и COUNT(*)).
+POSTS_PAGINATION = "page"
+
+POSTS_PER_PAGE = 10
+
+# Сколько номеров страниц показывать по обе стороны от текущей.
+PAGINATOR_WINDOW = 2
+
+# Сколько слов запроса учитывает полнотекстовый поиск.
+SEARCH_MAX_TERMS = 8
+
+# Сколько постов читать одним запросом при выгрузке.
+EXPORT_BATCH_SIZE = 500
+
+# Время жизни кэшированных размеров лент, секунды. Сигналы обновляют
+# счётчики сразу, таймаут лишь ограничивает расхождение после массовых
+# операций в обход сигналов.
+FEED_COUNT_TIMEOUT = 60 * 5
+
+# Размер пачки при заполнении материализованных лент подписок.
+TIMELINE_BATCH_SIZE = 1000
+
+# Сколько пользователей пересобирать в одной транзакции rebuild_timelines.
+TIMELINE_REBUILD_USERS = 500
+
+# Способ сборки ленты подписок: "timeline" (материализованная лента),
+# "merge" (слияние кэшированных списков свежих постов авторов) или
+# "join" (прямой запрос через подписки).
+FOLLOW_FEED_ENGINE = "timeline"
+
+# Сколько последних постов автора держать в кэше для движка "merge".
+RECENT_POSTS_LENGTH = 1000
+
+# Время жизни закэшированных страниц для анонимных посетителей, секунды.
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Сколько последних постов отдают RSS- и Atom-ленты.
+FEED_ITEMS = 20
+
+# Размер страницы JSON API по умолчанию и наибольший допустимый.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+# Защита фрагментов от лавины промахов: сколько секунд после истечения
+# фрагмент ещё отдаётся, пока один запрос его пересчитывает; срок
+# блокировки пересчёта; сколько ждать чужого пересчёта при пустом кэше;
+# коэффициент раннего пересчёта (0 — только по истечении).
+STAMPEDE_STALE_TTL = 60 * 5
+STAMPEDE_LOCK_TIMEOUT = 30
+STAMPEDE_WAIT = 2
+STAMPEDE_BETA = 1.0
+
+# Миниатюры, которые готовятся сразу после загрузки картинки поста:
+# геометрия sorl-thumbnail вида ШИРИНАxВЫСОТА и её параметры.
+POST_THUMBNAILS = {"960x339": {"crop": "center", "upscale": True}}
+
+# Дополнительные ширины миниатюр для srcset: телефонам не нужна
+# полноразмерная копия.
+POST_THUMBNAIL_WIDTHS = (320, 640)
+
+# Потоков фоновой подготовки миниатюр; 0 — готовить в самом запросе.
+POST_THUMBNAIL_WORKERS = 2
+
+# Срок жизни сведений о готовых миниатюрах, секунды. По истечении
+# миниатюры проверяются заново, так что запись о файлах, удалённых
+# в обход приложения, не живёт дольше этого срока.
+POST_THUMBNAIL_RECORD_TIMEOUT = 60 * 60 * 24 * 7
+
+# Обработка картинок постов при загрузке: предельный размер файла
+# и число пикселей исходника (проверяются до распаковки), наибольшая
+# сторона после уменьшения, формат ("JPEG", "WEBP" или "PNG") и
+# качество перекодирования.
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_FORMAT = "JPEG"
+POST_IMAGE_QUALITY = 82
+
+# Удалять ли в фоновом потоке файлы, удаление которых release отложил
+# на время posts.images.RELEASE_GRACE. Без этого, а также если процесс
+# перезапустили раньше, такие файлы удаляет команда collect_media.
+POST_IMAGE_DEFERRED_RELEASE = True
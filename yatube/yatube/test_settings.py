@@ -0,0 +1,34 @@
+"""Настройки тестов поверх рабочих.
+
+pytest берёт их из pytest.ini, а manage.py test применяет OVERRIDES
+через core.testing.TestRunner, поэтому рабочие настройки не гадают,
+запущены ли они под тестами.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES as _CACHES
+
+_TMP_DIR = tempfile.mkdtemp(prefix="yatube-tests-")
+atexit.register(shutil.rmtree, _TMP_DIR, True)
+
+# Тесты очищают кэш, поэтому L2 живёт во временном файле, а не
+# в cache.sqlite3 запущенного сервера разработки.
+CACHES = {
+    "default": dict(
+        _CACHES["default"], LOCATION=os.path.join(_TMP_DIR, "cache.sqlite3")
+    )
+}
+
+# Миниатюры готовятся в самом запросе: фоновые потоки не видят
+# транзакцию тестовой базы и пишут в MEDIA_ROOT, который тесты удаляют
+# после себя.
+POST_THUMBNAIL_WORKERS = 0
+
+OVERRIDES = {
+    "CACHES": CACHES,
+    "POST_THUMBNAIL_WORKERS": POST_THUMBNAIL_WORKERS,
+}